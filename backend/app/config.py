@@ -6,13 +6,25 @@ from pathlib import Path
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-BASE_DIR = Path(__file__).resolve().parents[2]
+SETTINGS_CONFIG = SettingsConfigDict(env_prefix="HPT_", env_file=".env", env_file_encoding="utf-8")
+
+
+class BaseDirSettings(BaseSettings):
+    """Корень проекта: HPT_BASE_DIR из окружения или .env, иначе каталог над пакетом backend."""
+
+    base_dir: Path = Path(__file__).resolve().parents[2]
+
+    model_config = SettingsConfigDict(**SETTINGS_CONFIG, extra="ignore")
+
+
+BASE_DIR = BaseDirSettings().base_dir
 DATA_DIR = BASE_DIR / "data"
 
 
 class AppSettings(BaseSettings):
     """Глобальные настройки приложения и путей хранения."""
 
+    base_dir: Path = BASE_DIR
     data_dir: Path = DATA_DIR
     primary_store: Path = DATA_DIR / "project_tracker.json"
     backups_dir: Path = DATA_DIR / "backups"
@@ -20,12 +32,22 @@ class AppSettings(BaseSettings):
     images_dir: Path = DATA_DIR / "images"
     logs_dir: Path = DATA_DIR / "logs"
 
-    model_config = SettingsConfigDict(env_prefix="HPT_", env_file=".env", env_file_encoding="utf-8")
+    model_config = SETTINGS_CONFIG
+
+
+def ensure_directories(app_settings: AppSettings) -> None:
+    """Создать каталоги данных, которых ещё нет на диске."""
+
+    for path in (
+        app_settings.data_dir,
+        app_settings.backups_dir,
+        app_settings.files_dir,
+        app_settings.images_dir,
+        app_settings.logs_dir,
+    ):
+        if not path.is_dir():
+            path.mkdir(parents=True, exist_ok=True)
 
 
 settings = AppSettings()
-settings.data_dir.mkdir(parents=True, exist_ok=True)
-settings.backups_dir.mkdir(parents=True, exist_ok=True)
-settings.files_dir.mkdir(parents=True, exist_ok=True)
-settings.images_dir.mkdir(parents=True, exist_ok=True)
-settings.logs_dir.mkdir(parents=True, exist_ok=True)
+ensure_directories(settings)
@@ -3,13 +3,14 @@
 from __future__ import annotations
 
 from datetime import date, datetime
+from functools import lru_cache
 from io import BytesIO
+from operator import attrgetter, itemgetter
 import re
-from typing import Iterable
+from types import MappingProxyType
+from typing import TYPE_CHECKING, AbstractSet, Callable, Iterable
 from uuid import UUID, uuid4
 
-from openpyxl import Workbook, load_workbook
-
 from .models import (
     CharacteristicField,
     CharacteristicSection,
@@ -28,24 +29,46 @@ from .models import (
     TaskUrgency,
 )
 
+if TYPE_CHECKING:
+    from openpyxl import Workbook
+
 
 def _find_current_stage_name(project: Project) -> str | None:
-    if not project.current_gtm_stage_id:
+    stage_id = project.current_gtm_stage_id
+    if stage_id is None:
         return None
-    for stage in project.gtm_stages:
-        if stage.id == project.current_gtm_stage_id:
-            return stage.title
-    return None
+    return next((stage.title for stage in project.gtm_stages if stage.id == stage_id), None)
 
 
 CUSTOM_FIELD_PREFIX = "CF:"
 EXCEL_SHEET_LIMIT = 31
+# Символы, запрещённые в названиях листов Excel
+_SHEET_NAME_FORBIDDEN = re.compile(r"[\\/*?:\[\]]")
+_BY_ORDER = attrgetter("order")
+# Значения перечислений для записи в ячейки: поиск в словаре дешевле обращения к .value
+_PROJECT_STATUS_VALUE = {member: member.value for member in ProjectStatus}
+_PRIORITY_VALUE = {member: member.value for member in PriorityLevel}
+_STAGE_STATUS_VALUE = {member: member.value for member in StageStatus}
+_TASK_STATUS_VALUE = {member: member.value for member in TaskStatus}
+_URGENCY_VALUE = {member: member.value for member in TaskUrgency}
+_FIELD_TYPE_VALUE = {member: member.value for member in FieldType}
+# Префикс пункта чек-листа по флагу done: False -> 0, True -> 1
+_CHECKLIST_MARKS = ("[ ] ", "[x] ")
+
+
+def _workbook_to_bytes(workbook: Workbook) -> bytes:
+    """Сохранить книгу в память и вернуть содержимое файла."""
+
+    buffer = BytesIO()
+    workbook.save(buffer)
+    # getvalue() отдаёт внутренний буфер BytesIO без копирования, seek(0) для этого не нужен
+    return buffer.getvalue()
 
 
 def _make_sheet_name(base: str, used: set[str]) -> str:
     """Сформировать валидное имя листа и избежать дубликатов."""
 
-    cleaned = re.sub(r"[\\/*?:\[\]]", "_", base).strip() or "Проект"
+    cleaned = _SHEET_NAME_FORBIDDEN.sub("_", base).strip() or "Проект"
     trimmed = cleaned[:EXCEL_SHEET_LIMIT]
     candidate = trimmed
     suffix = 1
@@ -57,11 +80,63 @@ def _make_sheet_name(base: str, used: set[str]) -> str:
     return candidate
 
 
+PROJECT_HEADERS = (
+    "ID",
+    "Короткий ID",
+    "Название проекта",
+    "Продуктовая группа",
+    "Бренд",
+    "Рынок/регион",
+    "Статус",
+    "Плановая дата запуска",
+    "Фактическая дата запуска",
+    "Текущий GTM-этап",
+    "Приоритет",
+    "MOQ",
+    "FOB",
+    "PROMO",
+    "RRP",
+    "Краткое описание",
+    "Полное описание",
+)
+
+
+def _project_headers(custom_keys: list[str]) -> tuple[str, ...]:
+    """Заголовки листа проектов с колонками пользовательских полей."""
+
+    return PROJECT_HEADERS + tuple(f"{CUSTOM_FIELD_PREFIX}{key}" for key in custom_keys)
+
+
+def _project_row(project: Project, group_name: str, custom_keys: list[str]) -> tuple:
+    """Строка листа проектов в порядке `PROJECT_HEADERS` и пользовательских полей."""
+
+    custom_fields = project.custom_fields
+    return (
+        str(project.id),
+        project.short_id,
+        project.name,
+        group_name,
+        project.brand,
+        project.market,
+        _PROJECT_STATUS_VALUE[project.status],
+        project.planned_launch,
+        project.actual_launch,
+        _find_current_stage_name(project),
+        _PRIORITY_VALUE.get(project.priority),
+        project.moq,
+        project.fob_price,
+        project.promo_price,
+        project.rrp_price,
+        project.short_description,
+        project.full_description,
+    ) + tuple(custom_fields.get(key) for key in custom_keys)
+
+
 def export_projects_to_excel(
     *,
     projects: Iterable[Project],
     groups: Iterable[ProductGroup],
-    statuses: set[ProjectStatus] | None = None,
+    statuses: AbstractSet[ProjectStatus] | None = None,
     include_archived: bool = True,
     brand: str | None = None,
     current_stage_id: UUID | None = None,
@@ -70,117 +145,82 @@ def export_projects_to_excel(
 ) -> bytes:
     """Сформировать Excel-файл со списком проектов с полным набором полей."""
 
-    projects_list: list[Project] = list(projects)
-    if statuses is not None:
-        projects_list = [p for p in projects_list if p.status in statuses]
-    if not include_archived:
-        projects_list = [p for p in projects_list if p.status != ProjectStatus.ARCHIVED]
-    if brand:
-        projects_list = [p for p in projects_list if p.brand.lower() == brand.lower()]
-    if current_stage_id:
-        projects_list = [p for p in projects_list if p.current_gtm_stage_id == current_stage_id]
-    if planned_from:
-        projects_list = [
-            p
-            for p in projects_list
-            if p.planned_launch is not None and p.planned_launch >= planned_from
-        ]
-    if planned_to:
-        projects_list = [
-            p
-            for p in projects_list
-            if p.planned_launch is not None and p.planned_launch <= planned_to
-        ]
+    from openpyxl import Workbook
+
+    brand_lc = brand.lower() if brand else None
+    check_planned = bool(planned_from or planned_to)
+    projects_list: list[Project] = []
+    for p in projects:
+        status = p.status
+        if statuses is not None and status not in statuses:
+            continue
+        if not include_archived and status == ProjectStatus.ARCHIVED:
+            continue
+        if brand_lc is not None and p.brand.lower() != brand_lc:
+            continue
+        if current_stage_id and p.current_gtm_stage_id != current_stage_id:
+            continue
+        if check_planned:
+            planned = p.planned_launch
+            if planned is None:
+                continue
+            if planned_from and planned < planned_from:
+                continue
+            if planned_to and planned > planned_to:
+                continue
+        projects_list.append(p)
 
     group_name_by_id = {group.id: group.name for group in groups}
     custom_keys: list[str] = sorted({key for p in projects_list for key in p.custom_fields.keys()})
 
-    workbook = Workbook()
-    sheet = workbook.active
-    sheet.title = "Проекты"
-
-    headers = [
-        "ID",
-        "Короткий ID",
-        "Название проекта",
-        "Продуктовая группа",
-        "Бренд",
-        "Рынок/регион",
-        "Статус",
-        "Плановая дата запуска",
-        "Фактическая дата запуска",
-        "Текущий GTM-этап",
-        "Приоритет",
-        "MOQ",
-        "FOB",
-        "PROMO",
-        "RRP",
-        "Краткое описание",
-        "Полное описание",
-    ]
-    headers.extend(f"{CUSTOM_FIELD_PREFIX}{key}" for key in custom_keys)
-    sheet.append(headers)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Проекты")
 
+    sheet.append(_project_headers(custom_keys))
+
+    append_row = sheet.append
+    group_name = group_name_by_id.get
     for project in projects_list:
-        current_stage_name = _find_current_stage_name(project)
-        row = [
-            str(project.id),
-            project.short_id,
-            project.name,
-            group_name_by_id.get(project.group_id, ""),
-            project.brand,
-            project.market,
-            project.status.value,
-            project.planned_launch,
-            project.actual_launch,
-            current_stage_name,
-            project.priority.value if project.priority else None,
-            project.moq,
-            project.fob_price,
-            project.promo_price,
-            project.rrp_price,
-            project.short_description,
-            project.full_description,
-        ]
-        for key in custom_keys:
-            row.append(project.custom_fields.get(key))
-        sheet.append(row)
+        append_row(_project_row(project, group_name(project.group_id, ""), custom_keys))
+
+    return _workbook_to_bytes(workbook)
+
+
+GTM_HEADERS = (
+    "Порядок этапа",
+    "Название этапа",
+    "Описание этапа",
+    "Плановая дата начала",
+    "Плановая дата окончания",
+    "Фактическая дата завершения",
+    "Статус этапа",
+    "Риск по этапу",
+    "Чек-лист",
+    "Порядок задачи",
+    "Название задачи",
+    "Описание задачи",
+    "Статус задачи",
+    "Срок задачи",
+    "Важная задача",
+    "Срочность задачи",
+    "Порядок подзадачи",
+    "Название подзадачи",
+    "Подзадача выполнена",
+    "Комментарий задачи",
+    "Дата комментария",
+)
 
-    buffer = BytesIO()
-    workbook.save(buffer)
-    buffer.seek(0)
-    return buffer.getvalue()
+
+# Пустые колонки задачи для строки этапа, у которого нет задач
+_EMPTY_TASK_COLUMNS = (None,) * 7
 
 
 def _write_gtm_sheet(workbook: Workbook, project: Project, title: str = "GTM") -> None:
     sheet = workbook.create_sheet(title)
 
-    headers = [
-        "Порядок этапа",
-        "Название этапа",
-        "Описание этапа",
-        "Плановая дата начала",
-        "Плановая дата окончания",
-        "Фактическая дата завершения",
-        "Статус этапа",
-        "Риск по этапу",
-        "Чек-лист",
-        "Порядок задачи",
-        "Название задачи",
-        "Описание задачи",
-        "Статус задачи",
-        "Срок задачи",
-        "Важная задача",
-        "Срочность задачи",
-        "Порядок подзадачи",
-        "Название подзадачи",
-        "Подзадача выполнена",
-        "Комментарий задачи",
-        "Дата комментария",
-    ]
-    sheet.append(headers)
-
-    ordered_stages = sorted(project.gtm_stages, key=lambda s: s.order)
+    sheet.append(GTM_HEADERS)
+
+    ordered_stages = sorted(project.gtm_stages, key=_BY_ORDER)
     stage_order_map = {stage.id: idx for idx, stage in enumerate(ordered_stages, start=1)}
     ordered_tasks = sorted(
         project.tasks,
@@ -192,101 +232,117 @@ def _write_gtm_sheet(workbook: Workbook, project: Project, title: str = "GTM") -
         ),
     )
 
+    tasks_by_stage: dict[UUID | None, list[Task]] = {}
+    for task in ordered_tasks:
+        tasks_by_stage.setdefault(task.gtm_stage_id, []).append(task)
+
     for stage in ordered_stages:
-        related_tasks = [t for t in ordered_tasks if t.gtm_stage_id == stage.id] or [None]
+        related_tasks = tasks_by_stage.get(stage.id) or [None]
         stage_checklist = "; ".join(
-            f"{'[x]' if item.done else '[ ]'} {item.title}" for item in sorted(stage.checklist, key=lambda c: c.order)
+            [_CHECKLIST_MARKS[item.done] + item.title for item in sorted(stage.checklist, key=_BY_ORDER)]
+        )
+        # Колонки этапа одинаковы во всех его строках, поэтому собираются один раз
+        stage_prefix = (
+            stage.order,
+            stage.title,
+            stage.description,
+            stage.planned_start,
+            stage.planned_end,
+            stage.actual_end,
+            _STAGE_STATUS_VALUE[stage.status],
+            "да" if stage.risk_flag else "нет",
+            stage_checklist,
         )
 
         for task_idx, task in enumerate(related_tasks, start=1):
-            subtasks = sorted(task.subtasks, key=lambda s: s.order) if task else []
-            comments = task.comments if task else []
+            if task is None:
+                subtasks, comments = [], []
+                task_prefix = stage_prefix + _EMPTY_TASK_COLUMNS
+            else:
+                subtasks = sorted(task.subtasks, key=_BY_ORDER)
+                comments = task.comments
+                task_prefix = stage_prefix + (
+                    task_idx,
+                    task.title,
+                    task.description,
+                    _TASK_STATUS_VALUE[task.status],
+                    task.due_date,
+                    "да" if task.important else None,
+                    _URGENCY_VALUE[task.urgency],
+                )
             rows = max(1, len(subtasks), len(comments))
             for row_idx in range(rows):
                 sub = subtasks[row_idx] if row_idx < len(subtasks) else None
                 comment = comments[row_idx] if row_idx < len(comments) else None
                 sheet.append(
-                    [
-                        stage.order,
-                        stage.title,
-                        stage.description,
-                        stage.planned_start,
-                        stage.planned_end,
-                        stage.actual_end,
-                        stage.status.value,
-                        "да" if stage.risk_flag else "нет",
-                        stage_checklist,
-                        task_idx if task else None,
-                        task.title if task else None,
-                        task.description if task else None,
-                        task.status.value if task else None,
-                        task.due_date if task else None,
-                        "да" if (task and task.important) else None,
-                        task.urgency.value if task else None,
+                    task_prefix
+                    + (
                         sub.order if sub else None,
                         sub.title if sub else None,
                         "да" if (sub and sub.done) else None,
                         comment.text if comment else None,
                         (comment.created_at.isoformat() if comment else None),
-                    ]
+                    )
                 )
 
 
 def export_gtm_stages_to_excel(project: Project) -> bytes:
     """Выгрузить этапы, задачи, подзадачи и комментарии в одну таблицу."""
 
-    workbook = Workbook()
-    workbook.remove(workbook.active)
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
     _write_gtm_sheet(workbook, project, "GTM")
 
-    buffer = BytesIO()
-    workbook.save(buffer)
-    buffer.seek(0)
-    return buffer.getvalue()
+    return _workbook_to_bytes(workbook)
+
 
+CHARACTERISTICS_HEADERS = (
+    "Секция",
+    "Порядок секции",
+    "Label RU",
+    "Label EN",
+    "Value RU",
+    "Value EN",
+    "Тип поля",
+    "Порядок поля",
+)
 
-def _write_characteristics_sheet(workbook: Workbook, project: Project, title: str = "Характеристики") -> None:
+
+def _write_characteristics_sheet(
+    workbook: Workbook, project: Project, title: str = "Характеристики", preamble: tuple | None = None
+) -> None:
     sheet = workbook.create_sheet(title)
 
-    headers = [
-        "Секция",
-        "Порядок секции",
-        "Label RU",
-        "Label EN",
-        "Value RU",
-        "Value EN",
-        "Тип поля",
-        "Порядок поля",
-    ]
-    sheet.append(headers)
-
-    for section in sorted(project.characteristics, key=lambda s: s.order):
-        for field in sorted(section.fields, key=lambda f: f.order):
+    if preamble:
+        sheet.append(preamble)
+    sheet.append(CHARACTERISTICS_HEADERS)
+
+    for section in sorted(project.characteristics, key=_BY_ORDER):
+        for field in sorted(section.fields, key=_BY_ORDER):
             sheet.append(
-                [
+                (
                     section.title,
                     section.order,
                     field.label_ru,
                     field.label_en,
                     field.value_ru,
                     field.value_en,
-                    field.field_type.value,
+                    _FIELD_TYPE_VALUE[field.field_type],
                     field.order,
-                ]
+                )
             )
 
 
 def export_characteristics_to_excel(project: Project) -> bytes:
     """Сформировать Excel-файл с характеристиками проекта."""
 
-    workbook = Workbook()
-    workbook.remove(workbook.active)
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
     _write_characteristics_sheet(workbook, project, "Характеристики")
 
-    buffer = BytesIO()
-    workbook.save(buffer)
-    buffer.seek(0)
-    return buffer.getvalue()
+    return _workbook_to_bytes(workbook)
 
 
 def _write_project_sheet(
@@ -295,58 +351,18 @@ def _write_project_sheet(
     sheet = workbook.create_sheet(title)
 
     custom_keys = sorted(project.custom_fields.keys())
-    headers = [
-        "ID",
-        "Короткий ID",
-        "Название проекта",
-        "Продуктовая группа",
-        "Бренд",
-        "Рынок/регион",
-        "Статус",
-        "Плановая дата запуска",
-        "Фактическая дата запуска",
-        "Текущий GTM-этап",
-        "Приоритет",
-        "MOQ",
-        "FOB",
-        "PROMO",
-        "RRP",
-        "Краткое описание",
-        "Полное описание",
-    ]
-    headers.extend(f"{CUSTOM_FIELD_PREFIX}{key}" for key in custom_keys)
-    sheet.append(headers)
-
-    current_stage_name = _find_current_stage_name(project)
-    row = [
-        str(project.id),
-        project.short_id,
-        project.name,
-        group_lookup.get(project.group_id, project.group_id) if group_lookup else project.group_id,
-        project.brand,
-        project.market,
-        project.status.value,
-        project.planned_launch,
-        project.actual_launch,
-        current_stage_name,
-        project.priority.value if project.priority else None,
-        project.moq,
-        project.fob_price,
-        project.promo_price,
-        project.rrp_price,
-        project.short_description,
-        project.full_description,
-    ]
-    for key in custom_keys:
-        row.append(project.custom_fields.get(key))
-    sheet.append(row)
+    sheet.append(_project_headers(custom_keys))
+
+    group_name = group_lookup.get(project.group_id, project.group_id) if group_lookup else project.group_id
+    sheet.append(_project_row(project, group_name, custom_keys))
 
 
 def export_project_bundle(project: Project, groups: Iterable[ProductGroup] | None = None) -> bytes:
     """Выгрузить проект с базовыми полями, характеристиками и GTM в один файл."""
 
-    workbook = Workbook()
-    workbook.remove(workbook.active)
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
 
     group_lookup = {g.id: g.name for g in groups} if groups else {}
 
@@ -354,10 +370,7 @@ def export_project_bundle(project: Project, groups: Iterable[ProductGroup] | Non
     _write_characteristics_sheet(workbook, project, "Характеристики")
     _write_gtm_sheet(workbook, project, "GTM")
 
-    buffer = BytesIO()
-    workbook.save(buffer)
-    buffer.seek(0)
-    return buffer.getvalue()
+    return _workbook_to_bytes(workbook)
 
 
 def _parse_bool(value: str | bool | None) -> bool:
@@ -369,6 +382,73 @@ def _parse_bool(value: str | bool | None) -> bool:
     return normalized in {"1", "true", "да", "y", "yes", "oui", "on"}
 
 
+@lru_cache(maxsize=4096)
+def _normalize(value: str | None) -> str:
+    """Привести строку к виду для сравнения без учёта регистра и пробелов по краям.
+
+    Названия секций, этапов и подписи полей повторяются из строки в строку,
+    поэтому результат кешируется.
+    """
+
+    return value.strip().lower() if value else ""
+
+
+def _read_header(first_row) -> tuple[dict[str, int], dict[str, str]]:
+    """Разобрать строку заголовков за один проход.
+
+    Возвращает индекс столбца и исходное написание заголовка по его названию
+    в нижнем регистре; пустые ячейки пропускаются.
+    """
+
+    header_map: dict[str, int] = {}
+    original_titles: dict[str, str] = {}
+    for idx, value in enumerate(first_row):
+        if value is None:
+            continue
+        title = str(value).strip()
+        if not title:
+            continue
+        key = title.lower()
+        header_map[key] = idx
+        original_titles[key] = title
+    return header_map, original_titles
+
+
+def _parse_datetime(value: datetime | date | str | None) -> datetime | None:
+    """Привести значение ячейки к datetime; openpyxl обычно уже отдаёт готовые даты."""
+
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _parse_checklist(raw) -> list[ChecklistItem]:
+    """Разобрать чек-лист вида "[x] пункт; [ ] пункт" в элементы по порядку."""
+
+    if not raw:
+        return []
+    items: list[ChecklistItem] = []
+    for part in str(raw).split(";"):
+        item = part.strip()
+        if not item:
+            continue
+        prefix = item[:3]
+        if prefix == "[x]":
+            items.append(ChecklistItem(title=item[3:].strip(), done=True, order=len(items)))
+        elif prefix == "[ ]":
+            items.append(ChecklistItem(title=item[3:].strip(), order=len(items)))
+        else:
+            items.append(ChecklistItem(title=item, order=len(items)))
+    return items
+
+
 STATUS_ALIASES = {
     "не начат": StageStatus.NOT_STARTED,
     "not started": StageStatus.NOT_STARTED,
@@ -382,6 +462,14 @@ STATUS_ALIASES = {
     "cancelled": StageStatus.CANCELLED,
 }
 
+# Псевдонимы и имена членов перечисления в одном неизменяемом словаре: значение разбирается одним .get()
+_STAGE_STATUS_LOOKUP = MappingProxyType(
+    {
+        **{name.lower(): member for name, member in StageStatus.__members__.items()},
+        **STATUS_ALIASES,
+    }
+)
+
 TASK_STATUS_ALIASES = {
     "todo": TaskStatus.TODO,
     "to do": TaskStatus.TODO,
@@ -393,6 +481,13 @@ TASK_STATUS_ALIASES = {
     "готово": TaskStatus.DONE,
 }
 
+_TASK_STATUS_LOOKUP = MappingProxyType(
+    {
+        **{name.lower(): member for name, member in TaskStatus.__members__.items()},
+        **TASK_STATUS_ALIASES,
+    }
+)
+
 URGENCY_ALIASES = {
     "normal": TaskUrgency.NORMAL,
     "обычная": TaskUrgency.NORMAL,
@@ -402,34 +497,37 @@ URGENCY_ALIASES = {
     "высокая": TaskUrgency.HIGH,
 }
 
+_URGENCY_LOOKUP = MappingProxyType(
+    {
+        **{name.lower(): member for name, member in TaskUrgency.__members__.items()},
+        **URGENCY_ALIASES,
+    }
+)
+
 
 def import_gtm_stages_from_excel(content: bytes) -> tuple[list[GTMStage], list[Task], list[str]]:
     """Распарсить Excel с этапами GTM, задачами, подзадачами и комментариями."""
 
+    from openpyxl import load_workbook
+
     try:
-        workbook = load_workbook(filename=BytesIO(content))
+        workbook = load_workbook(filename=BytesIO(content), read_only=True)
     except Exception as exc:  # noqa: BLE001
         return [], [], [f"Не удалось прочитать Excel: {exc}"]
 
-    sheet = workbook.active
-    return import_gtm_stages_from_sheet(sheet)
+    # В режиме read_only книга держит открытый zip-архив до явного close()
+    try:
+        return import_gtm_stages_from_sheet(workbook.active)
+    finally:
+        workbook.close()
 
 
 def import_gtm_stages_from_sheet(sheet) -> tuple[list[GTMStage], list[Task], list[str]]:
     try:
-        first_row = next(sheet.iter_rows(max_row=1))
+        first_row = next(sheet.iter_rows(max_row=1, values_only=True))
     except StopIteration:
         return [], [], ["Файл Excel пуст"]
-    header_row = [str(cell.value).strip() if cell.value is not None else "" for cell in first_row]
-    header_map = {title.lower(): idx for idx, title in enumerate(header_row) if title}
-
-    def normalize(value: str | None) -> str:
-        return value.strip().lower() if value else ""
-
-    def col(key: str, default: int | None = None) -> int | None:
-        if key in header_map:
-            return header_map[key]
-        return default
+    header_map, _ = _read_header(first_row)
 
     required_columns = {"название этапа"}
     missing = required_columns - set(header_map)
@@ -451,114 +549,100 @@ def _import_gtm_single_sheet(sheet, header_map: dict[str, int]):
     stage_index: dict[str, GTMStage] = {}
     task_index: dict[tuple[UUID, str, int], Task] = {}
 
-    def normalize(value: str | None) -> str:
-        return value.strip().lower() if value else ""
-
-    def col(key: str, default: int | None = None) -> int | None:
-        if key in header_map:
-            return header_map[key]
-        return default
-
-    def parse_datetime(value) -> datetime | None:
-        if isinstance(value, datetime):
-            return value
-        if value is None:
-            return None
-        try:
-            return datetime.fromisoformat(str(value))
-        except ValueError:
-            return None
-
-    for row_index, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-        if all(cell is None for cell in row):
-            continue
-
-        stage_title_raw = row[col("название этапа")]
+    # Индексы столбцов определяются один раз: в цикле по строкам только обращение к кортежу
+    stage_title_idx = header_map["название этапа"]
+    stage_order_idx = header_map.get("порядок этапа")
+    stage_description_idx = header_map.get("описание этапа")
+    planned_start_idx = header_map.get("плановая дата начала")
+    planned_end_idx = header_map.get("плановая дата окончания")
+    actual_end_idx = header_map.get("фактическая дата завершения")
+    stage_status_idx = header_map.get("статус этапа")
+    risk_idx = header_map.get("риск по этапу")
+    checklist_idx = header_map.get("чек-лист")
+    task_order_idx = header_map.get("порядок задачи")
+    task_title_idx = header_map.get("название задачи")
+    task_description_idx = header_map.get("описание задачи")
+    task_status_idx = header_map.get("статус задачи")
+    due_date_idx = header_map.get("срок задачи")
+    important_idx = header_map.get("важная задача")
+    urgency_idx = header_map.get("срочность задачи")
+    sub_order_idx = header_map.get("порядок подзадачи")
+    sub_title_idx = header_map.get("название подзадачи")
+    sub_done_idx = header_map.get("подзадача выполнена")
+    comment_idx = header_map.get("комментарий задачи")
+    comment_date_idx = header_map.get("дата комментария")
+    # В режиме read_only строки обрезаются по последней заполненной ячейке, поэтому ширину задаём явно
+    column_count = max(header_map.values()) + 1
+
+    for row_index, row in enumerate(sheet.iter_rows(min_row=2, max_col=column_count, values_only=True), start=2):
+        stage_title_raw = row[stage_title_idx]
         if not stage_title_raw:
-            errors.append(f"Строка {row_index}: пустое название этапа")
+            # Полностью пустые строки пропускаются молча
+            if any(row):
+                errors.append(f"Строка {row_index}: пустое название этапа")
             continue
 
-        stage_key = normalize(str(stage_title_raw))
+        stage_key = _normalize(str(stage_title_raw))
         stage = stage_index.get(stage_key)
         if stage is None:
-            order_raw = row[col("порядок этапа")]
+            order_raw = row[stage_order_idx] if stage_order_idx is not None else None
             try:
                 order_value = int(order_raw) if order_raw not in (None, "") else len(stages)
             except (TypeError, ValueError):
                 order_value = len(stages)
 
-            status_cell = col("статус этапа")
-            status_raw = row[status_cell] if status_cell is not None else None
+            status_raw = row[stage_status_idx] if stage_status_idx is not None else None
             status_value = StageStatus.NOT_STARTED
             if status_raw:
-                normalized = str(status_raw).strip().lower()
-                status_value = STATUS_ALIASES.get(normalized, None) or StageStatus.__members__.get(normalized.upper(), None)
+                status_value = _STAGE_STATUS_LOOKUP.get(str(status_raw).strip().lower())
                 if status_value is None:
                     errors.append(f"Строка {row_index}: неизвестный статус '{status_raw}'")
                     status_value = StageStatus.NOT_STARTED
 
-            checklist_cell = col("чек-лист")
-            checklist_raw = row[checklist_cell] if checklist_cell is not None else None
-            checklist_items: list[str] = []
-            if checklist_raw:
-                checklist_items = [part.strip() for part in str(checklist_raw).split(";") if part.strip()]
-
-            checklist_models = []
-            for idx, item in enumerate(checklist_items):
-                text = item
-                done = False
-                if item.startswith("[x]"):
-                    done = True
-                    text = item[3:].strip()
-                elif item.startswith("[ ]"):
-                    text = item[3:].strip()
-                checklist_models.append(ChecklistItem(title=text, done=done, order=idx))
+            checklist_models = _parse_checklist(row[checklist_idx]) if checklist_idx is not None else []
 
             stage = GTMStage(
                 title=str(stage_title_raw).strip(),
-                description=row[col("описание этапа")],
+                description=row[stage_description_idx] if stage_description_idx is not None else None,
                 order=order_value,
-                planned_start=row[col("плановая дата начала")],
-                planned_end=row[col("плановая дата окончания")],
-                actual_end=row[col("фактическая дата завершения")],
+                planned_start=row[planned_start_idx] if planned_start_idx is not None else None,
+                planned_end=row[planned_end_idx] if planned_end_idx is not None else None,
+                actual_end=row[actual_end_idx] if actual_end_idx is not None else None,
                 status=status_value,
-                risk_flag=_parse_bool(row[col("риск по этапу")]) if col("риск по этапу") is not None else False,
+                risk_flag=_parse_bool(row[risk_idx]) if risk_idx is not None else False,
                 checklist=checklist_models,
             )
             stages.append(stage)
             stage_index[stage_key] = stage
 
-        task_title_raw = row[col("название задачи")]
-        task_order_raw = row[col("порядок задачи")]
-        task_key = None
+        task_title_raw = row[task_title_idx] if task_title_idx is not None else None
         if task_title_raw:
+            task_order_raw = row[task_order_idx] if task_order_idx is not None else None
             try:
                 task_order = int(task_order_raw) if task_order_raw not in (None, "") else 0
             except (TypeError, ValueError):
                 task_order = 0
-            task_key = (stage.id, normalize(str(task_title_raw)), task_order)
+            task_key = (stage.id, _normalize(str(task_title_raw)), task_order)
 
             if task_key not in task_index:
-                status_raw = row[col("статус задачи")]
+                status_raw = row[task_status_idx] if task_status_idx is not None else None
                 status = TaskStatus.TODO
                 if status_raw:
-                    status = TASK_STATUS_ALIASES.get(str(status_raw).strip().lower(), None) or TaskStatus.__members__.get(
-                        str(status_raw).strip().upper(), TaskStatus.TODO
-                    )
+                    status = _TASK_STATUS_LOOKUP.get(str(status_raw).strip().lower(), TaskStatus.TODO)
 
-                urgency_raw = row[col("срочность задачи")]
+                urgency_raw = row[urgency_idx] if urgency_idx is not None else None
                 urgency = TaskUrgency.NORMAL
                 if urgency_raw:
-                    urgency = URGENCY_ALIASES.get(str(urgency_raw).strip().lower(), TaskUrgency.NORMAL)
+                    urgency = _URGENCY_LOOKUP.get(str(urgency_raw).strip().lower(), TaskUrgency.NORMAL)
 
-                important_raw = row[col("важная задача")]
+                important_raw = row[important_idx] if important_idx is not None else None
                 important = _parse_bool(important_raw) if important_raw is not None else False
 
                 task_obj = Task(
                     title=str(task_title_raw).strip(),
-                    description=row[col("описание задачи")],
+                    description=row[task_description_idx] if task_description_idx is not None else None,
                     status=status,
-                    due_date=row[col("срок задачи")],
+                    due_date=row[due_date_idx] if due_date_idx is not None else None,
                     important=important,
                     urgency=urgency,
                     gtm_stage_id=stage.id,
@@ -570,104 +654,85 @@ def _import_gtm_single_sheet(sheet, header_map: dict[str, int]):
 
             task_obj = task_index[task_key]
 
-            sub_title = row[col("название подзадачи")]
+            sub_title = row[sub_title_idx] if sub_title_idx is not None else None
             if sub_title:
                 try:
-                    sub_order = int(row[col("порядок подзадачи")]) if col("порядок подзадачи") is not None else 0
+                    sub_order = int(row[sub_order_idx]) if sub_order_idx is not None else 0
                 except (TypeError, ValueError):
                     sub_order = 0
-                done_raw = row[col("подзадача выполнена")]
-                done = _parse_bool(done_raw)
+                done = _parse_bool(row[sub_done_idx]) if sub_done_idx is not None else False
                 task_obj.subtasks.append(Subtask(title=str(sub_title).strip(), done=done, order=sub_order))
 
-            comment_text = row[col("комментарий задачи")]
+            comment_text = row[comment_idx] if comment_idx is not None else None
             if comment_text:
-                created_at_col = col("дата комментария")
-                created_at = parse_datetime(row[created_at_col]) if created_at_col is not None else None
+                created_at = _parse_datetime(row[comment_date_idx]) if comment_date_idx is not None else None
                 task_obj.comments.append(
                     Comment(text=str(comment_text).strip(), created_at=created_at or datetime.utcnow())
                 )
 
-    stages.sort(key=lambda s: s.order)
+    stages.sort(key=_BY_ORDER)
     stage_order_map = {stage.id: stage.order for stage in stages}
     for stage in stages:
-        stage.checklist.sort(key=lambda c: c.order)
+        stage.checklist.sort(key=_BY_ORDER)
     tasks.sort(key=lambda t: (stage_order_map.get(t.gtm_stage_id, 999), t.title.lower()))
     for task in tasks:
-        task.subtasks.sort(key=lambda s: s.order)
+        task.subtasks.sort(key=_BY_ORDER)
         
     return stages, tasks, errors
 
 
 def _import_gtm_legacy(workbook, header_map: dict[str, int]):
     sheet = workbook.active
+    sheet_names = set(workbook.sheetnames)
     stages: list[GTMStage] = []
     tasks_raw: list[tuple[int, GTMStage, Task]] = []
     errors: list[str] = []
 
-    def normalize(value: str | None) -> str:
-        return value.strip().lower() if value else ""
-
-    def col(key: str, default: int | None = None) -> int | None:
-        if key in header_map:
-            return header_map[key]
-        return default
-
-    for row_index, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-        if all(cell is None for cell in row):
-            continue
-
-        title = row[col("название этапа")]
+    title_idx = header_map["название этапа"]
+    order_idx = header_map.get("порядок")
+    status_idx = header_map.get("статус")
+    risk_idx = header_map.get("риск")
+    checklist_idx = header_map.get("чек-лист")
+    description_idx = header_map.get("описание")
+    planned_start_idx = header_map.get("плановая дата начала")
+    planned_end_idx = header_map.get("плановая дата окончания")
+    actual_end_idx = header_map.get("фактическая дата завершения")
+
+    column_count = max(header_map.values()) + 1
+    for row_index, row in enumerate(sheet.iter_rows(min_row=2, max_col=column_count, values_only=True), start=2):
+        title = row[title_idx]
         if not title:
-            errors.append(f"Строка {row_index}: пустое название этапа")
+            if any(row):
+                errors.append(f"Строка {row_index}: пустое название этапа")
             continue
 
-        order_cell = col("порядок")
         order_value = len(stages)
-        if order_cell is not None and row[order_cell] is not None:
+        if order_idx is not None and row[order_idx] is not None:
             try:
-                order_value = int(row[order_cell])
+                order_value = int(row[order_idx])
             except ValueError:
-                errors.append(f"Строка {row_index}: не удалось разобрать порядок '{row[order_cell]}'")
+                errors.append(f"Строка {row_index}: не удалось разобрать порядок '{row[order_idx]}'")
                 continue
 
-        status_cell = col("статус")
-        status_raw = row[status_cell] if status_cell is not None else None
+        status_raw = row[status_idx] if status_idx is not None else None
         status_value = StageStatus.NOT_STARTED
         if status_raw:
-            normalized = str(status_raw).strip().lower()
-            status_value = STATUS_ALIASES.get(normalized, None) or StageStatus.__members__.get(normalized.upper(), None)
+            status_value = _STAGE_STATUS_LOOKUP.get(str(status_raw).strip().lower())
             if status_value is None:
                 errors.append(f"Строка {row_index}: неизвестный статус '{status_raw}'")
                 continue
 
-        risk_cell = col("риск")
-        risk_value = _parse_bool(row[risk_cell]) if risk_cell is not None else False
-
-        checklist_cell = col("чек-лист")
-        checklist_raw = row[checklist_cell] if checklist_cell is not None else None
-        checklist_items: list[str] = []
-        if checklist_raw:
-            checklist_items = [part.strip() for part in str(checklist_raw).split(";") if part.strip()]
-
-        checklist_models = []
-        for idx, item in enumerate(checklist_items):
-            text = item
-            done = False
-            if item.startswith("[x]"):
-                done = True
-                text = item[3:].strip()
-            elif item.startswith("[ ]"):
-                text = item[3:].strip()
-            checklist_models.append(ChecklistItem(title=text, done=done, order=idx))
+        risk_value = _parse_bool(row[risk_idx]) if risk_idx is not None else False
+
+        checklist_models = _parse_checklist(row[checklist_idx]) if checklist_idx is not None else []
 
         stage = GTMStage(
             title=str(title).strip(),
-            description=(row[col("описание")] if col("описание") is not None else None),
+            description=row[description_idx] if description_idx is not None else None,
             order=order_value,
-            planned_start=row[col("плановая дата начала")] if col("плановая дата начала") is not None else None,
-            planned_end=row[col("плановая дата окончания")] if col("плановая дата окончания") is not None else None,
-            actual_end=row[col("фактическая дата завершения")] if col("фактическая дата завершения") is not None else None,
+            planned_start=row[planned_start_idx] if planned_start_idx is not None else None,
+            planned_end=row[planned_end_idx] if planned_end_idx is not None else None,
+            actual_end=row[actual_end_idx] if actual_end_idx is not None else None,
             status=status_value,
             risk_flag=risk_value,
             checklist=checklist_models,
@@ -675,38 +740,38 @@ def _import_gtm_legacy(workbook, header_map: dict[str, int]):
 
         stages.append(stage)
 
-    stages.sort(key=lambda s: s.order)
+    stages.sort(key=_BY_ORDER)
 
-    stage_index = {normalize(str(stage.title)): stage for stage in stages}
+    stage_index = {_normalize(str(stage.title)): stage for stage in stages}
     stage_order_map = {stage.id: idx for idx, stage in enumerate(stages)}
 
-    if "Задачи" in workbook.sheetnames:
+    if "Задачи" in sheet_names:
         task_sheet = workbook["Задачи"]
         try:
-            first_task_row = next(task_sheet.iter_rows(max_row=1))
+            first_task_row = next(task_sheet.iter_rows(max_row=1, values_only=True))
         except StopIteration:
             first_task_row = []
-        task_header = [str(cell.value).strip() if cell.value is not None else "" for cell in first_task_row]
-        task_header_map = {title.lower(): idx for idx, title in enumerate(task_header) if title}
-
-        def task_col(key: str, default: int | None = None) -> int | None:
-            if key in task_header_map:
-                return task_header_map[key]
-            return default
-
-        task_order_col = task_col("порядок задачи")
-        for row_index, row in enumerate(task_sheet.iter_rows(min_row=2, values_only=True), start=2):
-            if all(cell is None for cell in row):
-                continue
-
-            stage_title = row[task_col("этап")]
-            normalized_stage = normalize(stage_title if stage_title is not None else "")
+        task_header_map, _ = _read_header(first_task_row)
+
+        task_stage_idx = task_header_map.get("этап")
+        task_order_idx = task_header_map.get("порядок задачи")
+        task_title_idx = task_header_map.get("название задачи")
+        task_status_idx = task_header_map.get("статус")
+        task_urgency_idx = task_header_map.get("срочность")
+        task_important_idx = task_header_map.get("важная")
+        task_description_idx = task_header_map.get("описание")
+        task_due_idx = task_header_map.get("срок")
+
+        for row_index, row in enumerate(task_sheet.iter_rows(min_row=2, max_col=len(first_task_row) or None, values_only=True), start=2):
+            stage_title = row[task_stage_idx] if task_stage_idx is not None else None
+            normalized_stage = _normalize(stage_title if stage_title is not None else "")
             stage = stage_index.get(normalized_stage)
             if stage is None:
-                errors.append(f"Строка {row_index} (Задачи): этап '{stage_title}' не найден среди импортируемых этапов")
+                if any(row):
+                    errors.append(f"Строка {row_index} (Задачи): этап '{stage_title}' не найден среди импортируемых этапов")
                 continue
 
-            order_value = row[task_order_col] if task_order_col is not None else None
+            order_value = row[task_order_idx] if task_order_idx is not None else None
             task_order = 0
             try:
                 task_order = int(order_value) if order_value not in (None, "") else 0
@@ -714,31 +779,29 @@ def _import_gtm_legacy(workbook, header_map: dict[str, int]):
                 errors.append(f"Строка {row_index} (Задачи): неверный порядок задачи '{order_value}'")
                 continue
 
-            title = row[task_col("название задачи")]
+            title = row[task_title_idx] if task_title_idx is not None else None
             if not title:
                 errors.append(f"Строка {row_index} (Задачи): пустое название задачи")
                 continue
 
-            status_raw = row[task_col("статус")]
+            status_raw = row[task_status_idx] if task_status_idx is not None else None
             status = TaskStatus.TODO
             if status_raw:
-                status = TASK_STATUS_ALIASES.get(str(status_raw).strip().lower(), None) or TaskStatus.__members__.get(
-                    str(status_raw).strip().upper(), TaskStatus.TODO
-                )
+                status = _TASK_STATUS_LOOKUP.get(str(status_raw).strip().lower(), TaskStatus.TODO)
 
-            urgency_raw = row[task_col("срочность")]
+            urgency_raw = row[task_urgency_idx] if task_urgency_idx is not None else None
             urgency = TaskUrgency.NORMAL
             if urgency_raw:
-                urgency = URGENCY_ALIASES.get(str(urgency_raw).strip().lower(), TaskUrgency.NORMAL)
+                urgency = _URGENCY_LOOKUP.get(str(urgency_raw).strip().lower(), TaskUrgency.NORMAL)
 
-            important_raw = row[task_col("важная")]
+            important_raw = row[task_important_idx] if task_important_idx is not None else None
             important = _parse_bool(important_raw) if important_raw is not None else False
 
             task_obj = Task(
                 title=str(title).strip(),
-                description=row[task_col("описание")],
+                description=row[task_description_idx] if task_description_idx is not None else None,
                 status=status,
-                due_date=row[task_col("срок")],
+                due_date=row[task_due_idx] if task_due_idx is not None else None,
                 important=important,
                 urgency=urgency,
                 gtm_stage_id=stage.id,
@@ -748,46 +811,43 @@ def _import_gtm_legacy(workbook, header_map: dict[str, int]):
             tasks_raw.append((task_order, stage, task_obj))
 
     subtasks_map: dict[tuple[UUID, int], list[Subtask]] = {}
-    if "Подзадачи" in workbook.sheetnames:
+    if "Подзадачи" in sheet_names:
         sub_sheet = workbook["Подзадачи"]
         try:
-            first_sub_row = next(sub_sheet.iter_rows(max_row=1))
+            first_sub_row = next(sub_sheet.iter_rows(max_row=1, values_only=True))
         except StopIteration:
             first_sub_row = []
-        sub_header = [str(cell.value).strip() if cell.value is not None else "" for cell in first_sub_row]
-        sub_header_map = {title.lower(): idx for idx, title in enumerate(sub_header) if title}
+        sub_header_map, _ = _read_header(first_sub_row)
 
-        def sub_col(key: str, default: int | None = None) -> int | None:
-            if key in sub_header_map:
-                return sub_header_map[key]
-            return default
-
-        for row_index, row in enumerate(sub_sheet.iter_rows(min_row=2, values_only=True), start=2):
-            if all(cell is None for cell in row):
-                continue
+        sub_stage_idx = sub_header_map.get("этап")
+        sub_task_order_idx = sub_header_map.get("порядок задачи")
+        sub_title_idx = sub_header_map.get("название подзадачи")
+        sub_done_idx = sub_header_map.get("выполнена")
+        sub_order_idx = sub_header_map.get("порядок подзадачи")
 
-            stage_title = row[sub_col("этап")]
-            normalized_stage = normalize(stage_title if stage_title is not None else "")
+        for row_index, row in enumerate(sub_sheet.iter_rows(min_row=2, max_col=len(first_sub_row) or None, values_only=True), start=2):
+            stage_title = row[sub_stage_idx] if sub_stage_idx is not None else None
+            normalized_stage = _normalize(stage_title if stage_title is not None else "")
             stage = stage_index.get(normalized_stage)
             if stage is None:
-                errors.append(f"Строка {row_index} (Подзадачи): этап '{stage_title}' не найден")
+                if any(row):
+                    errors.append(f"Строка {row_index} (Подзадачи): этап '{stage_title}' не найден")
                 continue
 
-            task_order_raw = row[sub_col("порядок задачи")]
+            task_order_raw = row[sub_task_order_idx] if sub_task_order_idx is not None else None
             try:
                 task_order_value = int(task_order_raw) if task_order_raw not in (None, "") else 0
             except (TypeError, ValueError):
                 errors.append(f"Строка {row_index} (Подзадачи): неверный порядок задачи '{task_order_raw}'")
                 continue
 
-            title = row[sub_col("название подзадачи")]
+            title = row[sub_title_idx] if sub_title_idx is not None else None
             if not title:
                 errors.append(f"Строка {row_index} (Подзадачи): пустое название подзадачи")
                 continue
 
-            done_raw = row[sub_col("выполнена")]
-            done = _parse_bool(done_raw)
-            order_raw = row[sub_col("порядок подзадачи")]
+            done = _parse_bool(row[sub_done_idx]) if sub_done_idx is not None else False
+            order_raw = row[sub_order_idx] if sub_order_idx is not None else None
             try:
                 order_val = int(order_raw) if order_raw not in (None, "") else 0
             except (TypeError, ValueError):
@@ -802,13 +862,61 @@ def _import_gtm_legacy(workbook, header_map: dict[str, int]):
     ordered_tasks: list[Task] = []
     for task_order, stage, task_obj in sorted(tasks_raw, key=lambda t: (stage_order_map.get(t[1].id, 999), t[0])):
         key = (stage.id, task_order)
-        subs = sorted(subtasks_map.get(key, []), key=lambda s: s.order)
+        subs = sorted(subtasks_map.get(key, []), key=_BY_ORDER)
         task_obj.subtasks = subs
         ordered_tasks.append(task_obj)
 
     return stages, ordered_tasks, errors
 
 
+@lru_cache(maxsize=4096)
+def _parse_date_text(text: str) -> date | None:
+    # Даты в колонках проекта повторяются из строки в строку, поэтому разбор кешируется
+    text = text.strip()
+    if "T" in text or " " in text:
+        text = text.split("T")[0].split(" ")[0]
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text).date()
+    except ValueError:
+        return None
+
+
+def _normalize_date(value) -> date | None:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if value is None:
+        return None
+    return _parse_date_text(str(value))
+
+
+def _coerce_number(raw: str | int | float | bool | None) -> str | int | float | bool | None:
+    # Excel числа уже приходят числовыми; строки аккуратно конвертируем
+    if raw is None or isinstance(raw, (int, float)):
+        return raw
+    text = raw.strip() if isinstance(raw, str) else str(raw).strip()
+    if not text:
+        return raw
+    try:
+        numeric = float(text.replace(",", "."))
+    except ValueError:
+        return raw
+    return int(numeric) if numeric.is_integer() else numeric
+
+
+def _custom_field_columns(header_map: dict[str, int], original_titles: dict[str, str]) -> list[tuple[int, str]]:
+    """Пары (индекс столбца, ключ поля) для колонок пользовательских полей с префиксом `CF:`."""
+
+    prefix = CUSTOM_FIELD_PREFIX.lower()
+    prefix_len = len(CUSTOM_FIELD_PREFIX)
+    return [(idx, original_titles[key][prefix_len:]) for key, idx in header_map.items() if key.startswith(prefix)]
+
+
 PROJECT_STATUS_ALIASES = {
     "в работе": ProjectStatus.IN_PROGRESS,
     "in progress": ProjectStatus.IN_PROGRESS,
@@ -832,6 +940,32 @@ PRIORITY_ALIASES = {
     "high": PriorityLevel.HIGH,
 }
 
+_PROJECT_STATUS_LOOKUP = MappingProxyType(
+    {
+        **{name.lower(): member for name, member in ProjectStatus.__members__.items()},
+        **PROJECT_STATUS_ALIASES,
+    }
+)
+
+_PRIORITY_LOOKUP = MappingProxyType(
+    {
+        **{name.lower(): member for name, member in PriorityLevel.__members__.items()},
+        **PRIORITY_ALIASES,
+    }
+)
+
+
+def _parse_project_status(raw, default: ProjectStatus) -> ProjectStatus:
+    if raw is None:
+        return default
+    return _PROJECT_STATUS_LOOKUP.get(_normalize(str(raw)), default)
+
+
+def _parse_priority(raw, default: PriorityLevel | None) -> PriorityLevel | None:
+    if raw is None or raw == "":
+        return default
+    return _PRIORITY_LOOKUP.get(_normalize(str(raw)), default)
+
 
 def import_projects_from_excel(
     content: bytes,
@@ -840,20 +974,69 @@ def import_projects_from_excel(
 ) -> tuple[list[Project], list[str]]:
     """Распарсить Excel со списком проектов и вернуть новые модели."""
 
+    from openpyxl import load_workbook
+
     try:
-        workbook = load_workbook(filename=BytesIO(content))
+        workbook = load_workbook(filename=BytesIO(content), read_only=True)
     except Exception as exc:  # noqa: BLE001
         return [], [f"Не удалось прочитать Excel: {exc}"]
 
-    sheet = workbook.active
     try:
-        first_row = next(sheet.iter_rows(max_row=1))
+        return import_projects_from_sheet(workbook.active, groups, existing_projects)
+    finally:
+        workbook.close()
+
+
+# Необязательные столбцы листа проектов: (поле модели, заголовок в нижнем регистре, парсер значения)
+_PROJECT_VALUE_COLUMNS = (
+    ("market", "рынок/регион", None),
+    ("planned_launch", "плановая дата запуска", _normalize_date),
+    ("actual_launch", "фактическая дата запуска", _normalize_date),
+    ("moq", "moq", _coerce_number),
+    ("fob_price", "fob", _coerce_number),
+    ("promo_price", "promo", _coerce_number),
+    ("rrp_price", "rrp", _coerce_number),
+    ("short_description", "краткое описание", None),
+    ("full_description", "полное описание", None),
+)
+_PROJECT_VALUE_FIELDS = tuple(field for field, _, _ in _PROJECT_VALUE_COLUMNS)
+
+
+def _project_value_columns(header_map: dict[str, int]) -> list[tuple[str, int, Callable | None]]:
+    """Необязательные столбцы, присутствующие в заголовке: (поле модели, индекс, парсер)."""
+
+    return [(field, header_map[title], parse) for field, title, parse in _PROJECT_VALUE_COLUMNS if title in header_map]
+
+
+def _project_row_values(row: tuple, value_columns: list[tuple[str, int, Callable | None]]) -> dict:
+    return {field: parse(row[idx]) if parse else row[idx] for field, idx, parse in value_columns}
+
+
+def _custom_field_values(row: tuple, custom_fields_columns: list[tuple[int, str]]) -> dict:
+    return {key: row[idx] for idx, key in custom_fields_columns if row[idx] not in (None, "")}
+
+
+def _stage_title_index(stages: Iterable[GTMStage]) -> dict[str, UUID]:
+    """Сопоставляет нормализованное название этапа с его id (первое совпадение)."""
+
+    index: dict[str, UUID] = {}
+    for stage in stages:
+        if stage.title:
+            index.setdefault(stage.title.strip().lower(), stage.id)
+    return index
+
+
+def import_projects_from_sheet(
+    sheet,
+    groups: Iterable[ProductGroup],
+    existing_projects: Iterable[Project],
+) -> tuple[list[Project], list[str]]:
+    try:
+        first_row = next(sheet.iter_rows(max_row=1, values_only=True))
     except StopIteration:
         return [], ["Файл Excel пуст"]
 
-    header_titles = [str(cell.value).strip() if cell.value is not None else "" for cell in first_row]
-    header_map = {title.lower(): idx for idx, title in enumerate(header_titles) if title}
-    original_titles = {title.lower(): title for title in header_titles if title}
+    header_map, original_titles = _read_header(first_row)
 
     required_columns = {"название проекта", "продуктовая группа", "бренд", "статус"}
     missing = required_columns - set(header_map)
@@ -863,102 +1046,68 @@ def import_projects_from_excel(
     existing_by_id = {str(p.id): p for p in existing_projects}
     group_by_name = {g.name.strip().lower(): g for g in groups}
 
-    def col(key: str, default: int | None = None) -> int | None:
-        if key in header_map:
-            return header_map[key]
-        return default
-
-    def parse_status(raw) -> ProjectStatus:
-        if raw is None:
-            return ProjectStatus.IN_PROGRESS
-        normalized = str(raw).strip().lower()
-        return PROJECT_STATUS_ALIASES.get(normalized, ProjectStatus.__members__.get(normalized.upper(), ProjectStatus.IN_PROGRESS))
-
-    def parse_priority(raw) -> PriorityLevel | None:
-        if raw is None or raw == "":
-            return None
-        normalized = str(raw).strip().lower()
-        return PRIORITY_ALIASES.get(normalized, PriorityLevel.__members__.get(normalized.upper(), None))
-
-    def normalize_date(value):
-        if isinstance(value, datetime):
-            return value.date()
-        if isinstance(value, date):
-            return value
-        if value is None:
-            return None
-        text = str(value).strip()
-        if "T" in text or " " in text:
-            text = text.split("T")[0].split(" ")[0]
-        for parser in (date.fromisoformat, lambda val: datetime.fromisoformat(val).date()):
-            try:
-                return parser(text)
-            except ValueError:
-                continue
-        return None
-
-    custom_fields_columns = [original_titles[key] for key in header_map if key.startswith(CUSTOM_FIELD_PREFIX.lower())]
+    custom_fields_columns = _custom_field_columns(header_map, original_titles)
+
+    # Индексы столбцов определяются один раз; обязательные проверены выше
+    name_col = header_map["название проекта"]
+    group_col = header_map["продуктовая группа"]
+    brand_col = header_map["бренд"]
+    status_col = header_map["статус"]
+    id_col = header_map.get("id")
+    short_id_col = header_map.get("короткий id")
+    stage_col = header_map.get("текущий gtm-этап")
+    priority_col = header_map.get("приоритет")
+    value_columns = _project_value_columns(header_map)
+    empty_values = dict.fromkeys(_PROJECT_VALUE_FIELDS)
+    # Значения обязательных столбцов достаются из строки одним вызовом
+    required_values = itemgetter(name_col, group_col, brand_col, status_col)
 
     parsed: list[Project] = []
     errors: list[str] = []
+    # Индексы названий этапов строятся лениво, один раз на проект
+    stage_indexes: dict[UUID, dict[str, UUID]] = {}
 
-    for row_index, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-        if all(cell is None for cell in row):
-            continue
-
-        name = row[col("название проекта")]
+    # В режиме read_only строки без явных границ листа могут быть короче заголовка
+    column_count = len(first_row)
+    for row_index, row in enumerate(sheet.iter_rows(min_row=2, max_col=column_count, values_only=True), start=2):
+        name, group_name, brand, status_raw = required_values(row)
         if not name:
-            errors.append(f"Строка {row_index}: не указано название проекта")
+            if any(row):
+                errors.append(f"Строка {row_index}: не указано название проекта")
             continue
 
-        group_name = row[col("продуктовая группа")]
         group = group_by_name.get(str(group_name).strip().lower()) if group_name else None
         if group is None:
             errors.append(f"Строка {row_index}: продуктовая группа '{group_name}' не найдена")
             continue
 
-        status_raw = row[col("статус")]
-        status = parse_status(status_raw)
+        status = _parse_project_status(status_raw, ProjectStatus.IN_PROGRESS)
 
-        project_id_val = row[col("id")] if col("id") is not None else None
+        project_id_val = row[id_col] if id_col is not None else None
         project_id = str(project_id_val).strip() if project_id_val else None
         existing = existing_by_id.get(project_id) if project_id else None
 
+        # Поля, для которых в файле нет столбца, очищаются
         base_kwargs = dict(
+            empty_values,
             group_id=group.id,
             name=str(name),
-            brand=str(row[col("бренд")]) if row[col("бренд")] is not None else "",
-            market=row[col("рынок/регион")],
+            brand=str(brand) if brand is not None else "",
             status=status,
-            planned_launch=normalize_date(row[col("плановая дата запуска")]),
-            actual_launch=normalize_date(row[col("фактическая дата запуска")]),
             current_gtm_stage_id=None,
-            priority=parse_priority(row[col("приоритет")]),
-            moq=_coerce_value(row[col("moq")], FieldType.NUMBER) if col("moq") is not None else None,
-            fob_price=_coerce_value(row[col("fob")], FieldType.NUMBER) if col("fob") is not None else None,
-            promo_price=_coerce_value(row[col("promo")], FieldType.NUMBER) if col("promo") is not None else None,
-            rrp_price=_coerce_value(row[col("rrp")], FieldType.NUMBER) if col("rrp") is not None else None,
-            short_description=row[col("краткое описание")],
-            full_description=row[col("полное описание")],
-            custom_fields={},
+            priority=_parse_priority(row[priority_col], None) if priority_col is not None else None,
+            custom_fields=_custom_field_values(row, custom_fields_columns),
         )
+        base_kwargs.update(_project_row_values(row, value_columns))
 
-        current_stage_title = row[col("текущий gtm-этап")] if col("текущий gtm-этап") is not None else None
+        current_stage_title = row[stage_col] if stage_col is not None else None
         if existing and current_stage_title:
-            matched_stage = next(
-                (stage for stage in existing.gtm_stages if stage.title.strip().lower() == str(current_stage_title).strip().lower()),
-                None,
-            )
-            base_kwargs["current_gtm_stage_id"] = matched_stage.id if matched_stage else None
+            stage_index = stage_indexes.get(existing.id)
+            if stage_index is None:
+                stage_index = stage_indexes[existing.id] = _stage_title_index(existing.gtm_stages)
+            base_kwargs["current_gtm_stage_id"] = stage_index.get(str(current_stage_title).strip().lower())
 
-        for cf_col in custom_fields_columns:
-            raw_value = row[header_map[cf_col.lower()]]
-            if raw_value in (None, ""):
-                continue
-            key = cf_col[len(CUSTOM_FIELD_PREFIX) :]
-            base_kwargs["custom_fields"][key] = raw_value
-
-        short_id_val = row[col("короткий id")]
+        short_id_val = row[short_id_col] if short_id_col is not None else None
         if existing:
             updated = existing.model_copy(update=base_kwargs)
             if short_id_val:
@@ -990,118 +1139,67 @@ def _parse_project_sheet(
     sheet, groups: Iterable[ProductGroup], existing_project: Project
 ) -> tuple[Project, list[str], str | None]:
     try:
-        first_row = next(sheet.iter_rows(max_row=1))
+        first_row = next(sheet.iter_rows(max_row=1, values_only=True))
     except StopIteration:
         return existing_project, ["Файл Excel пуст"], None
 
-    header_titles = [str(cell.value).strip() if cell.value is not None else "" for cell in first_row]
-    header_map = {title.lower(): idx for idx, title in enumerate(header_titles) if title}
-    original_titles = {title.lower(): title for title in header_titles if title}
+    header_map, original_titles = _read_header(first_row)
 
     required_columns = {"название проекта", "продуктовая группа"}
     missing = required_columns - set(header_map)
     if missing:
         return existing_project, [f"Отсутствуют обязательные столбцы: {', '.join(sorted(missing))}"], None
 
-    custom_fields_columns = [original_titles[key] for key in header_map if key.startswith(CUSTOM_FIELD_PREFIX.lower())]
+    custom_fields_columns = _custom_field_columns(header_map, original_titles)
     group_by_name = {g.name.strip().lower(): g for g in groups}
     errors: list[str] = []
 
-    def col(key: str, default: int | None = None) -> int | None:
-        if key in header_map:
-            return header_map[key]
-        return default
-
-    def parse_status(raw) -> ProjectStatus:
-        if raw is None:
-            return existing_project.status
-        normalized = str(raw).strip().lower()
-        return PROJECT_STATUS_ALIASES.get(normalized, ProjectStatus.__members__.get(normalized.upper(), existing_project.status))
-
-    def parse_priority(raw) -> PriorityLevel | None:
-        if raw is None or raw == "":
-            return existing_project.priority
-        normalized = str(raw).strip().lower()
-        return PRIORITY_ALIASES.get(normalized, PriorityLevel.__members__.get(normalized.upper(), existing_project.priority))
-
-    def normalize_date(value):
-        if isinstance(value, datetime):
-            return value.date()
-        if isinstance(value, date):
-            return value
-        if value is None:
-            return None
-        text = str(value).strip()
-        if "T" in text or " " in text:
-            text = text.split("T")[0].split(" ")[0]
-        for parser in (date.fromisoformat, lambda val: datetime.fromisoformat(val).date()):
-            try:
-                return parser(text)
-            except ValueError:
-                continue
-        return None
-
-    data_rows = list(sheet.iter_rows(min_row=2, values_only=True))
-    if not data_rows:
+    name_col = header_map["название проекта"]
+    group_col = header_map["продуктовая группа"]
+    brand_col = header_map.get("бренд")
+    status_col = header_map.get("статус")
+    short_id_col = header_map.get("короткий id")
+    stage_col = header_map.get("текущий gtm-этап")
+    priority_col = header_map.get("приоритет")
+
+    # Лист содержит один проект: достаточно первой строки данных
+    row = next(sheet.iter_rows(min_row=2, max_row=2, max_col=len(first_row), values_only=True), None)
+    if row is None:
         return existing_project, ["Не найдены данные проекта"], None
-    row = data_rows[0]
 
-    name = row[col("название проекта")]
+    name = row[name_col]
     if not name:
         errors.append("Не указано название проекта")
 
-    group_cell = row[col("продуктовая группа")]
+    group_cell = row[group_col]
     group = group_by_name.get(str(group_cell).strip().lower()) if group_cell else None
     if group is None:
         errors.append(f"Продуктовая группа '{group_cell}' не найдена")
 
-    current_stage_title = row[col("текущий gtm-этап")] if col("текущий gtm-этап") is not None else None
+    current_stage_title = row[stage_col] if stage_col is not None else None
 
     base_kwargs = dict(
         name=str(name).strip() if name else existing_project.name,
         group_id=group.id if group else existing_project.group_id,
-        brand=str(row[col("бренд")]) if col("бренд") is not None and row[col("бренд")] is not None else existing_project.brand,
-        market=row[col("рынок/регион")]
-        if col("рынок/регион") is not None
-        else existing_project.market,
-        status=parse_status(row[col("статус")]) if col("статус") is not None else existing_project.status,
-        planned_launch=normalize_date(row[col("плановая дата запуска")])
-        if col("плановая дата запуска") is not None
-        else existing_project.planned_launch,
-        actual_launch=normalize_date(row[col("фактическая дата запуска")])
-        if col("фактическая дата запуска") is not None
-        else existing_project.actual_launch,
-        current_gtm_stage_id=existing_project.current_gtm_stage_id,
-        priority=parse_priority(row[col("приоритет")]) if col("приоритет") is not None else existing_project.priority,
-        moq=_coerce_value(row[col("moq")], FieldType.NUMBER)
-        if col("moq") is not None
-        else existing_project.moq,
-        fob_price=_coerce_value(row[col("fob")], FieldType.NUMBER)
-        if col("fob") is not None
-        else existing_project.fob_price,
-        promo_price=_coerce_value(row[col("promo")], FieldType.NUMBER)
-        if col("promo") is not None
-        else existing_project.promo_price,
-        rrp_price=_coerce_value(row[col("rrp")], FieldType.NUMBER)
-        if col("rrp") is not None
-        else existing_project.rrp_price,
-        short_description=row[col("краткое описание")]
-        if col("краткое описание") is not None
-        else existing_project.short_description,
-        full_description=row[col("полное описание")]
-        if col("полное описание") is not None
-        else existing_project.full_description,
-        custom_fields=dict(existing_project.custom_fields),
+        brand=str(row[brand_col]) if brand_col is not None and row[brand_col] is not None else existing_project.brand,
+        status=_parse_project_status(row[status_col], existing_project.status)
+        if status_col is not None
+        else existing_project.status,
+        priority=_parse_priority(row[priority_col], existing_project.priority)
+        if priority_col is not None
+        else existing_project.priority,
+    )
+    # Отсутствующие в листе столбцы оставляют значения проекта без изменений
+    base_kwargs.update(_project_row_values(row, _project_value_columns(header_map)))
+
+    # Новый словарь нужен только при заполненных пользовательских полях,
+    # иначе обновлённый проект разделяет словарь с исходным, как и при model_copy
+    custom_values = _custom_field_values(row, custom_fields_columns)
+    base_kwargs["custom_fields"] = (
+        {**existing_project.custom_fields, **custom_values} if custom_values else existing_project.custom_fields
     )
 
-    for cf_col in custom_fields_columns:
-        raw_value = row[header_map[cf_col.lower()]]
-        if raw_value in (None, ""):
-            continue
-        key = cf_col[len(CUSTOM_FIELD_PREFIX) :]
-        base_kwargs["custom_fields"][key] = raw_value
-
-    short_id_val = row[col("короткий id")]
+    short_id_val = row[short_id_col] if short_id_col is not None else None
     updated = existing_project.model_copy(update=base_kwargs)
     if short_id_val not in (None, ""):
         try:
@@ -1115,43 +1213,48 @@ def _parse_project_sheet(
 def import_project_bundle_from_excel(
     content: bytes, groups: Iterable[ProductGroup], existing_project: Project
 ) -> tuple[Project, list[str]]:
+    from openpyxl import load_workbook
+
     try:
-        workbook = load_workbook(filename=BytesIO(content))
+        workbook = load_workbook(filename=BytesIO(content), read_only=True)
     except Exception as exc:  # noqa: BLE001
         return existing_project, [f"Не удалось прочитать Excel: {exc}"]
 
-    errors: list[str] = []
+    try:
+        errors: list[str] = []
+        # openpyxl собирает список sheetnames заново при каждом обращении
+        sheet_names = set(workbook.sheetnames)
+
+        basics_sheet = workbook["Основные параметры"] if "Основные параметры" in sheet_names else workbook.active
+        project_core, core_errors, current_stage_title = _parse_project_sheet(basics_sheet, groups, existing_project)
+        errors.extend(core_errors)
+
+        gtm_sheet = workbook["GTM"] if "GTM" in sheet_names else None
+        stages, tasks, gtm_errors = import_gtm_stages_from_sheet(gtm_sheet) if gtm_sheet else ([], [], ["Лист GTM не найден"])
+        errors.extend(gtm_errors)
+
+        characteristics_sheet = workbook["Характеристики"] if "Характеристики" in sheet_names else None
+        if characteristics_sheet:
+            char_sections, char_errors, _ = import_characteristics_from_sheet(characteristics_sheet, project_core)
+            errors.extend(char_errors)
+        else:
+            char_sections, _ = project_core.characteristics, None
+            errors.append("Лист характеристик не найден")
 
-    basics_sheet = workbook["Основные параметры"] if "Основные параметры" in workbook.sheetnames else workbook.active
-    project_core, core_errors, current_stage_title = _parse_project_sheet(basics_sheet, groups, existing_project)
-    errors.extend(core_errors)
+        if errors:
+            return project_core, errors
 
-    gtm_sheet = workbook["GTM"] if "GTM" in workbook.sheetnames else None
-    stages, tasks, gtm_errors = import_gtm_stages_from_sheet(gtm_sheet) if gtm_sheet else ([], [], ["Лист GTM не найден"])
-    errors.extend(gtm_errors)
+        if current_stage_title:
+            project_core.current_gtm_stage_id = _stage_title_index(stages).get(current_stage_title.strip().lower())
 
-    characteristics_sheet = (
-        workbook["Характеристики"] if "Характеристики" in workbook.sheetnames else None
-    )
-    if characteristics_sheet:
-        char_sections, char_errors, _ = import_characteristics_from_sheet(characteristics_sheet, project_core)
-        errors.extend(char_errors)
-    else:
-        char_sections, _ = project_core.characteristics, None
-        errors.append("Лист характеристик не найден")
-
-    if errors:
-        return project_core, errors
-
-    if current_stage_title:
-        matched_stage = next(
-            (s for s in stages if s.title and s.title.strip().lower() == current_stage_title.strip().lower()),
-            None,
-        )
-        project_core.current_gtm_stage_id = matched_stage.id if matched_stage else None
+        updated = project_core.model_copy(update={"gtm_stages": stages, "tasks": tasks, "characteristics": char_sections})
+        return updated, errors
+    finally:
+        workbook.close()
 
-    updated = project_core.model_copy(update={"gtm_stages": stages, "tasks": tasks, "characteristics": char_sections})
-    return updated, errors
+
+# Первая ячейка листа общего экспорта характеристик; по ней импорт узнаёт строку проекта над заголовками
+ALL_CHARACTERISTICS_PROJECT_PREFIX = "Проект: "
 
 
 def export_all_characteristics(
@@ -1159,8 +1262,9 @@ def export_all_characteristics(
     groups: Iterable[ProductGroup],
     project_filter: set[UUID] | None = None,
 ) -> bytes:
-    workbook = Workbook()
-    workbook.remove(workbook.active)
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
 
     used_names: set[str] = set()
     group_lookup = {g.id: g.name for g in groups}
@@ -1170,28 +1274,25 @@ def export_all_characteristics(
         if project_filter and project.id not in project_filter:
             continue
         sheet_name = _make_sheet_name(project.name or "Проект", used_names)
-        _write_characteristics_sheet(workbook, project, sheet_name)
-        sheet = workbook[sheet_name]
-        sheet.insert_rows(1)
-        sheet["A1"] = f"Проект: {project.name}"
-        sheet["B1"] = f"Группа: {group_lookup.get(project.group_id, '')}"
+        # Строка с проектом и группой пишется первой, над заголовками таблицы
+        preamble = (f"{ALL_CHARACTERISTICS_PROJECT_PREFIX}{project.name}", f"Группа: {group_lookup.get(project.group_id, '')}")
+        _write_characteristics_sheet(workbook, project, sheet_name, preamble)
         exported_any = True
 
     if not exported_any:
         sheet = workbook.create_sheet("Характеристики")
-        sheet.append(["Нет проектов для экспорта"])
+        sheet.append(("Нет проектов для экспорта",))
 
-    buffer = BytesIO()
-    workbook.save(buffer)
-    buffer.seek(0)
-    return buffer.getvalue()
+    return _workbook_to_bytes(workbook)
 
 
 def import_characteristics_bulk(
     content: bytes, projects: Iterable[Project]
 ) -> tuple[dict[UUID, list[CharacteristicSection]], list[str]]:
+    from openpyxl import load_workbook
+
     try:
-        workbook = load_workbook(filename=BytesIO(content))
+        workbook = load_workbook(filename=BytesIO(content), read_only=True)
     except Exception as exc:  # noqa: BLE001
         return {}, [f"Не удалось прочитать Excel: {exc}"]
 
@@ -1199,16 +1300,28 @@ def import_characteristics_bulk(
     updates: dict[UUID, list[CharacteristicSection]] = {}
     errors: list[str] = []
 
-    for sheet_name in workbook.sheetnames:
-        sheet = workbook[sheet_name]
-        project = project_index.get(sheet_name.strip().lower())
-        if project is None:
-            errors.append(f"Лист '{sheet_name}': проект не найден")
-            continue
-        sections, section_errors, _ = import_characteristics_from_sheet(sheet, project)
-        errors.extend([f"{sheet_name}: {err}" for err in section_errors])
-        if not section_errors:
-            updates[project.id] = sections
+    try:
+        for sheet_name in workbook.sheetnames:
+            sheet = workbook[sheet_name]
+            # Листы из export_all_characteristics начинаются со строки проекта: имя берётся из неё,
+            # так как название листа могло быть обрезано, а заголовки таблицы идут второй строкой
+            first_cell = next(sheet.iter_rows(max_row=1, max_col=1, values_only=True), (None,))[0]
+            if isinstance(first_cell, str) and first_cell.startswith(ALL_CHARACTERISTICS_PROJECT_PREFIX):
+                project_name = first_cell[len(ALL_CHARACTERISTICS_PROJECT_PREFIX):]
+                header_row = 2
+            else:
+                project_name = sheet_name
+                header_row = 1
+            project = project_index.get(project_name.strip().lower())
+            if project is None:
+                errors.append(f"Лист '{sheet_name}': проект не найден")
+                continue
+            sections, section_errors, _ = import_characteristics_from_sheet(sheet, project, header_row)
+            errors.extend([f"{sheet_name}: {err}" for err in section_errors])
+            if not section_errors:
+                updates[project.id] = sections
+    finally:
+        workbook.close()
 
     return updates, errors
 
@@ -1229,99 +1342,115 @@ FIELD_TYPE_ALIASES = {
 }
 
 
-def _coerce_value(raw: str | int | float | bool | None, field_type: FieldType) -> str | int | float | bool | None:
+def _parse_field_type(raw: str | None, fallback: FieldType) -> FieldType:
     if raw is None:
-        return None
+        return fallback
+    return FIELD_TYPE_ALIASES.get(_normalize(str(raw)), fallback)
 
-    if field_type == FieldType.CHECKBOX:
-        return _parse_bool(raw)
 
-    if field_type == FieldType.NUMBER:
-        try:
-            # Excel числа уже приходят числовыми; строки аккуратно конвертируем
-            if isinstance(raw, (int, float)):
-                return raw
-            cleaned = str(raw).strip().replace(",", ".")
-            numeric = float(cleaned)
-            return int(numeric) if numeric.is_integer() else numeric
-        except (ValueError, TypeError):
-            return raw
+def _empty_characteristics_report() -> dict[str, int]:
+    return {
+        "sections_created": 0,
+        "fields_created": 0,
+        "fields_updated": 0,
+        "rows_skipped": 0,
+    }
+
+
+def _coerce_checkbox(raw: str | int | float | bool | None) -> bool | None:
+    return None if raw is None else _parse_bool(raw)
+
 
+def _keep_raw(raw: str | int | float | bool | None) -> str | int | float | bool | None:
     return raw
 
 
+# Тип поля известен до разбора значений, поэтому преобразователь выбирается один раз на строку
+_COERCERS = {
+    FieldType.TEXT: _keep_raw,
+    FieldType.NUMBER: _coerce_number,
+    FieldType.SELECT: _keep_raw,
+    FieldType.CHECKBOX: _coerce_checkbox,
+    FieldType.OTHER: _keep_raw,
+}
+
+
 def import_characteristics_from_excel(
     content: bytes, project: Project
 ) -> tuple[list[CharacteristicSection], list[str], dict[str, int]]:
     """Распарсить Excel с характеристиками и вернуть обновлённые секции, ошибки и отчёт."""
 
+    from openpyxl import load_workbook
+
     try:
-        workbook = load_workbook(filename=BytesIO(content))
+        workbook = load_workbook(filename=BytesIO(content), read_only=True)
     except Exception as exc:  # noqa: BLE001
-        return [], [f"Не удалось прочитать Excel: {exc}"]
+        return [], [f"Не удалось прочитать Excel: {exc}"], _empty_characteristics_report()
 
-    sheet = workbook.active
-    return import_characteristics_from_sheet(sheet, project)
+    try:
+        return import_characteristics_from_sheet(workbook.active, project)
+    finally:
+        workbook.close()
 
 
 def import_characteristics_from_sheet(
-    sheet, project: Project
+    sheet, project: Project, header_row: int = 1
 ) -> tuple[list[CharacteristicSection], list[str], dict[str, int]]:
     try:
-        first_row = next(sheet.iter_rows(max_row=1))
+        first_row = next(sheet.iter_rows(min_row=header_row, max_row=header_row, values_only=True))
     except StopIteration:
-        return [], ["Файл Excel пуст"]
+        return [], ["Файл Excel пуст"], _empty_characteristics_report()
 
-    header_row = [str(cell.value).strip() if cell.value is not None else "" for cell in first_row]
-    header_map = {title.lower(): idx for idx, title in enumerate(header_row) if title}
+    header_map, _ = _read_header(first_row)
 
     required_columns = {"секция", "label ru", "label en", "value ru", "value en", "тип поля"}
     missing = required_columns - set(header_map)
     if missing:
-        return [], [f"Отсутствуют обязательные столбцы: {', '.join(sorted(missing))}"]
+        return [], [f"Отсутствуют обязательные столбцы: {', '.join(sorted(missing))}"], _empty_characteristics_report()
 
     errors: list[str] = []
-    sections_copy: list[CharacteristicSection] = [section.model_copy(deep=True) for section in project.characteristics]
-    report = {
-        "sections_created": 0,
-        "fields_created": 0,
-        "fields_updated": 0,
-        "rows_skipped": 0,
-    }
+    # Секции и поля проекта копируются только при первом изменении: при ошибках импорта
+    # исходные модели остаются нетронутыми, а нетронутые строками секции не копируются вовсе
+    sections_copy: list[CharacteristicSection] = list(project.characteristics)
+    owned_sections: set[UUID] = set()
+    owned_fields: set[UUID] = set()
+    # Для каждой затронутой секции: (label ru, label en) -> позиция поля и текущий максимальный порядок
+    field_indexes: dict[UUID, dict[tuple[str, str], int]] = {}
+    max_field_orders: dict[UUID, int] = {}
+    report = _empty_characteristics_report()
 
     # Быстрый доступ к существующим секциям и порядкам, чтобы корректно добавлять новые
-    section_index = {normalize(section.title): section for section in sections_copy}
+    section_index = {_normalize(section.title): section for section in sections_copy}
     max_section_order = max((section.order for section in sections_copy), default=-1)
 
-    def col(key: str, default: int | None = None) -> int | None:
-        if key in header_map:
-            return header_map[key]
-        return default
-
-    def normalize(value: str | None) -> str:
-        return value.strip().lower() if value else ""
-
-    def parse_field_type(raw: str | None, fallback: FieldType) -> FieldType:
-        if raw is None:
-            return fallback
-        normalized = normalize(str(raw))
-        return FIELD_TYPE_ALIASES.get(normalized, fallback)
-
-    section_order_col = col("порядок секции")
-    field_order_col = col("порядок поля")
-
-    for row_index, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-        if all(cell is None for cell in row):
-            continue
-
-        section_title = row[col("секция")]
+    # Обязательные столбцы проверены выше, поэтому их индексы известны заранее
+    section_col = header_map["секция"]
+    label_ru_col = header_map["label ru"]
+    label_en_col = header_map["label en"]
+    value_ru_col = header_map["value ru"]
+    value_en_col = header_map["value en"]
+    type_col = header_map["тип поля"]
+    section_order_col = header_map.get("порядок секции")
+    field_order_col = header_map.get("порядок поля")
+
+    # Функции, вызываемые для каждой строки, связываются с локальными именами
+    normalize = _normalize
+    parse_field_type = _parse_field_type
+    coercers = _COERCERS
+
+    data_start = header_row + 1
+    for row_index, row in enumerate(
+        sheet.iter_rows(min_row=data_start, max_col=len(first_row), values_only=True), start=data_start
+    ):
+        section_title = row[section_col]
         if not section_title:
-            errors.append(f"Строка {row_index}: не заполнено название секции")
-            report["rows_skipped"] += 1
+            if any(row):
+                errors.append(f"Строка {row_index}: не заполнено название секции")
+                report["rows_skipped"] += 1
             continue
 
-        label_ru = row[col("label ru")]
-        label_en = row[col("label en")]
+        label_ru = row[label_ru_col]
+        label_en = row[label_en_col]
         if not label_ru and not label_en:
             errors.append(f"Строка {row_index}: не указаны Label RU/EN")
             report["rows_skipped"] += 1
@@ -1339,22 +1468,26 @@ def import_characteristics_from_sheet(
             section = CharacteristicSection(title=str(section_title), order=order, fields=[])
             sections_copy.append(section)
             section_index[normalized_section] = section
+            owned_sections.add(section.id)
             report["sections_created"] += 1
+        elif section.id not in owned_sections:
+            position = sections_copy.index(section)
+            section = section.model_copy(update={"fields": list(section.fields)})
+            sections_copy[position] = section
+            section_index[normalized_section] = section
+            owned_sections.add(section.id)
 
-        max_field_order = max((fld.order for fld in section.fields), default=-1)
-        normalized_ru = normalize(label_ru or "")
-        normalized_en = normalize(label_en or "")
-        field = next(
-            (
-                f
-                for f in section.fields
-                if normalize(f.label_ru) == normalized_ru and normalize(f.label_en) == normalized_en
-            ),
-            None,
-        )
+        field_index = field_indexes.get(section.id)
+        if field_index is None:
+            field_index = {}
+            for position, existing_field in enumerate(section.fields):
+                field_index.setdefault((normalize(existing_field.label_ru), normalize(existing_field.label_en)), position)
+            field_indexes[section.id] = field_index
+            max_field_orders[section.id] = max((fld.order for fld in section.fields), default=-1)
+        max_field_order = max_field_orders[section.id]
 
-        type_cell_idx = col("тип поля")
-        provided_type = parse_field_type(row[type_cell_idx], FieldType.TEXT) if type_cell_idx is not None else FieldType.TEXT
+        field_position = field_index.get((normalize(label_ru or ""), normalize(label_en or "")))
+        field = section.fields[field_position] if field_position is not None else None
 
         if field is None:
             order_value = row[field_order_col] if field_order_col is not None else None
@@ -1366,24 +1499,33 @@ def import_characteristics_from_sheet(
             field = CharacteristicField(
                 label_ru=str(label_ru or label_en or ""),
                 label_en=str(label_en or label_ru or ""),
-                field_type=provided_type,
+                field_type=parse_field_type(row[type_col], FieldType.TEXT),
                 order=order,
             )
+            field_index.setdefault((normalize(field.label_ru), normalize(field.label_en)), len(section.fields))
             section.fields.append(field)
+            owned_fields.add(field.id)
+            max_field_orders[section.id] = max(max_field_order, order)
             report["fields_created"] += 1
         else:
-            field.field_type = parse_field_type(row[type_cell_idx], field.field_type) if type_cell_idx is not None else field.field_type
+            if field.id not in owned_fields:
+                field = field.model_copy()
+                section.fields[field_position] = field
+                owned_fields.add(field.id)
+            field.field_type = parse_field_type(row[type_col], field.field_type)
             report["fields_updated"] += 1
 
-        value_ru_idx = col("value ru")
-        value_en_idx = col("value en")
-        if value_ru_idx is not None:
-            field.value_ru = _coerce_value(row[value_ru_idx], field.field_type)
-        if value_en_idx is not None:
-            field.value_en = _coerce_value(row[value_en_idx], field.field_type)
+        coerce = coercers[field.field_type]
+        field.value_ru = coerce(row[value_ru_col])
+        field.value_en = coerce(row[value_en_col])
 
-    sections_copy.sort(key=lambda s: s.order)
-    for section in sections_copy:
-        section.fields.sort(key=lambda f: f.order)
+    sections_copy.sort(key=_BY_ORDER)
+    for position, section in enumerate(sections_copy):
+        if section.id in owned_sections:
+            section.fields.sort(key=_BY_ORDER)
+            continue
+        ordered_fields = sorted(section.fields, key=_BY_ORDER)
+        if ordered_fields != section.fields:
+            sections_copy[position] = section.model_copy(update={"fields": ordered_fields})
 
     return sections_copy, errors, report
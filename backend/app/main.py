@@ -10,17 +10,19 @@ import shutil
 import time
 import zipfile
 from datetime import date
+from functools import lru_cache
 import re
 from io import BytesIO
 from pathlib import Path
 from uuid import UUID, uuid4
 
 from PIL import Image
-from fastapi import Depends, FastAPI, File, Form, HTTPException, Query, Request, Response, UploadFile
-from fastapi.responses import FileResponse, HTMLResponse, StreamingResponse
+from pydantic import TypeAdapter
+from fastapi import FastAPI, File, Form, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 
-from .config import settings
+from .config import BASE_DIR, settings
 from .exporters import (
     export_characteristics_to_excel,
     export_gtm_stages_to_excel,
@@ -60,10 +62,31 @@ from .models import (
     TaskStatus,
     TaskSpotlightSummary,
 )
-from .storage import LocalRepository
+from .storage import (
+    AttachmentNotFound,
+    CharacteristicTemplateNotFound,
+    CommentNotFound,
+    FieldNotFound,
+    GroupHasProjects,
+    GroupNotFound,
+    GTMTemplateNotFound,
+    HistoryEventNotFound,
+    ImageNotFound,
+    LocalRepository,
+    NotFoundError,
+    ProjectNotFound,
+    SectionNotFound,
+    SourceProjectNotFound,
+    StageNotFound,
+    SubtaskNotFound,
+    TaskNotFound,
+)
 
-BASE_DIR = Path(__file__).resolve().parents[2]
 FRONTEND_DIR = BASE_DIR / "frontend"
+# Наличие каталога фронтенда проверяется один раз при импорте
+FRONTEND_EXISTS = FRONTEND_DIR.is_dir()
+# Символы, недопустимые в имени скачиваемого файла
+FILENAME_FORBIDDEN = re.compile(r"[\\/*?:\[\]\"<>|]")
 
 app = FastAPI(title="Projects Tracker", version="0.1.0")
 repository = LocalRepository(settings.primary_store)
@@ -83,10 +106,113 @@ def configure_logging() -> logging.Logger:
 logger = configure_logging()
 
 
-def get_repository() -> LocalRepository:
-    """Dependency для доступа к файловому хранилищу."""
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def excel_response(content: bytes, filename: str) -> Response:
+    """Отдать готовый Excel-файл одним телом ответа с Content-Length."""
+
+    return Response(
+        content=content,
+        media_type=XLSX_MEDIA_TYPE,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+# Готовые сериализаторы для самых объёмных списков: ответ собирается в pydantic-core целиком,
+# без поэлементной проверки response_model и jsonable_encoder
+GROUP_LIST_ADAPTER = TypeAdapter(list[ProductGroup])
+PROJECT_LIST_ADAPTER = TypeAdapter(list[Project])
+GTM_STAGE_LIST_ADAPTER = TypeAdapter(list[GTMStage])
+SECTION_LIST_ADAPTER = TypeAdapter(list[CharacteristicSection])
+TASK_LIST_ADAPTER = TypeAdapter(list[Task])
+
+
+def json_list(adapter: TypeAdapter, items: list) -> Response:
+    """Отдать список моделей JSON-ом, сериализованным одним вызовом адаптера."""
+
+    return Response(content=adapter.dump_json(items, by_alias=True), media_type="application/json")
+
+
+@lru_cache(maxsize=64)
+def _frozen_statuses(statuses: tuple) -> frozenset:
+    return frozenset(statuses)
+
+
+def status_filter(statuses: list | None) -> frozenset | None:
+    """Набор статусов для фильтра; одинаковые запросы получают один и тот же frozenset из кеша."""
+
+    return _frozen_statuses(tuple(statuses)) if statuses else None
+
+
+# Текст ответа 404 для каждого типа ошибки «не найдено» из хранилища
+NOT_FOUND_DETAILS: dict[type[KeyError], str] = {
+    ProjectNotFound: "Проект не найден",
+    SourceProjectNotFound: "Проект-источник не найден",
+    GroupNotFound: "Группа не найдена",
+    TaskNotFound: "Задача не найдена",
+    SubtaskNotFound: "Подзадача не найдена",
+    StageNotFound: "Этап GTM не найден",
+    SectionNotFound: "Секция характеристик не найдена",
+    FieldNotFound: "Поле характеристики не найдено",
+    GTMTemplateNotFound: "Шаблон GTM не найден",
+    CharacteristicTemplateNotFound: "Шаблон характеристик не найден",
+    AttachmentNotFound: "Файл не найден",
+    ImageNotFound: "Изображение не найдено",
+    CommentNotFound: "Комментарий не найден",
+    HistoryEventNotFound: "Событие истории не найдено",
+}
+
+
+def not_found(exc: KeyError) -> HTTPException:
+    """HTTP 404 с описанием, выбранным по типу ошибки хранилища."""
 
-    return repository
+    return HTTPException(status_code=404, detail=NOT_FOUND_DETAILS.get(type(exc), "Объект не найден"))
+
+
+def set_repository(new: LocalRepository) -> None:
+    """Подменить хранилище, с которым работают эндпоинты (например, в тестах).
+
+    Обработчики обращаются к модульной переменной `repository` напрямую,
+    без Depends, чтобы не разрешать зависимость на каждом запросе.
+    """
+
+    global repository
+    repository = new
+
+
+# GET-эндпоинты, ответ которых целиком определяется данными репозитория
+ETAG_PATHS = re.compile(
+    r"/api/(?:groups|projects|gtm-templates|characteristic-templates)(?:/[0-9a-fA-F-]{36})?"
+    r"|/api/projects/[0-9a-fA-F-]{36}/(?:gtm-stages|characteristics/sections|tasks)"
+)
+
+
+@app.exception_handler(NotFoundError)
+async def handle_not_found(request: Request, exc: NotFoundError) -> JSONResponse:
+    """Ошибки «не найдено», не перехваченные в эндпоинте, превращаются в 404 вместо 500."""
+
+    error = not_found(exc)
+    return JSONResponse(status_code=error.status_code, content={"detail": error.detail})
+
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):  # type: ignore[override]
+    """Отвечать 304 на повторные GET-запросы списков, если данные не менялись с прошлого ответа."""
+
+    if request.method != "GET" or not ETAG_PATHS.fullmatch(request.url.path):
+        return await call_next(request)
+
+    etag = f'W/"{repository.version_tag}"'
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+    return response
 
 
 @app.middleware("http")
@@ -170,24 +296,23 @@ def log_event(repo: LocalRepository, project_id: UUID, summary: str, details: st
 
 
 @app.get("/api/health")
-def health_check() -> dict[str, str]:
+async def health_check() -> dict[str, str]:
     """Простейший health-check эндпоинт."""
 
     return {"status": "ok"}
 
 
 @app.get("/api/dashboard", response_model=DashboardPayload)
-def get_dashboard(
+async def get_dashboard(
     include_archived: bool = False,
     group_id: UUID | None = None,
     brand: str | None = None,
     statuses: list[ProjectStatus] | None = Query(None),
-    repo: LocalRepository = Depends(get_repository),
 ) -> DashboardPayload:
     """Собрать агрегированные данные для главного дашборда."""
 
-    status_set = set(statuses) if statuses else None
-    return repo.build_dashboard(
+    status_set = status_filter(statuses)
+    return repository.build_dashboard(
         include_archived=include_archived,
         group_id=group_id,
         brand=brand,
@@ -197,39 +322,39 @@ def get_dashboard(
 
 
 @app.get("/api/groups", response_model=list[ProductGroup])
-def list_groups(
+async def list_groups(
     include_archived: bool = True,
     brand: str | None = None,
     status: list[GroupStatus] | None = Query(default=None),
     extra_key: str | None = None,
     extra_value: str | None = None,
-    repo: LocalRepository = Depends(get_repository),
 ) -> list[ProductGroup]:
     """Вернуть список продуктовых групп с фильтрами по статусу, бренду и пользовательскому полю."""
 
-    status_set = set(status) if status else None
-    return repo.list_groups(
+    status_set = status_filter(status)
+    groups = repository.list_groups(
         include_archived=include_archived,
         brand=brand,
         statuses=status_set,
         extra_key=extra_key,
         extra_value=extra_value,
     )
+    return json_list(GROUP_LIST_ADAPTER, groups)
 
 
 @app.get("/api/groups/custom-fields/filters", response_model=list[CustomFieldFilterMeta])
-def list_group_field_filters(repo: LocalRepository = Depends(get_repository)) -> list[CustomFieldFilterMeta]:
+async def list_group_field_filters() -> list[CustomFieldFilterMeta]:
     """Вернуть набор пользовательских полей, подходящих для фильтрации групп."""
 
-    return repo.list_group_filter_meta()
+    return repository.list_group_filter_meta()
 
 
 @app.post("/api/groups/search", response_model=list[ProductGroup])
-def search_groups(payload: GroupSearchRequest, repo: LocalRepository = Depends(get_repository)) -> list[ProductGroup]:
+def search_groups(payload: GroupSearchRequest) -> list[ProductGroup]:
     """Вернуть список групп с фильтрацией по пользовательским полям и статусам."""
 
-    status_set = set(payload.statuses) if payload.statuses else None
-    return repo.list_groups(
+    status_set = status_filter(payload.statuses)
+    groups = repository.list_groups(
         include_archived=payload.include_archived,
         brand=payload.brand,
         statuses=status_set,
@@ -237,46 +362,47 @@ def search_groups(payload: GroupSearchRequest, repo: LocalRepository = Depends(g
         extra_value=payload.extra_value,
         filters=payload.filters,
     )
+    return json_list(GROUP_LIST_ADAPTER, groups)
 
 
 @app.get("/api/groups/{group_id}", response_model=ProductGroup)
-def get_group(group_id: UUID, repo: LocalRepository = Depends(get_repository)) -> ProductGroup:
-    group = repo.get_group(group_id)
+async def get_group(group_id: UUID) -> ProductGroup:
+    group = repository.get_group(group_id)
     if not group:
         raise HTTPException(status_code=404, detail="Группа не найдена")
     return group
 
 
 @app.post("/api/groups", response_model=ProductGroup, status_code=201)
-def create_group(group: ProductGroup, repo: LocalRepository = Depends(get_repository)) -> ProductGroup:
+def create_group(group: ProductGroup) -> ProductGroup:
     """Создать продуктовую группу и сохранить её в файловом хранилище."""
 
-    return repo.add_group(group)
+    return repository.add_group(group)
 
 
 @app.put("/api/groups/{group_id}", response_model=ProductGroup)
-def update_group(group_id: UUID, group: ProductGroup, repo: LocalRepository = Depends(get_repository)) -> ProductGroup:
-    if repo.get_group(group_id) is None:
+def update_group(group_id: UUID, group: ProductGroup) -> ProductGroup:
+    if repository.get_group(group_id) is None:
         raise HTTPException(status_code=404, detail="Группа не найдена")
-    aligned_group = group.model_copy(update={"id": group_id})
-    return repo.update_group(group_id, aligned_group)
+    group.id = group_id
+    return repository.update_group(group_id, group)
 
 
 @app.delete("/api/groups/{group_id}", status_code=204)
-def delete_group(group_id: UUID, repo: LocalRepository = Depends(get_repository)) -> None:
-    if repo.has_projects_for_group(group_id):
+def delete_group(group_id: UUID) -> None:
+    try:
+        repository.delete_group(group_id)
+    except GroupHasProjects:
         raise HTTPException(
             status_code=400,
             detail="Невозможно удалить группу: найдены связанные проекты. Архивируйте или перенесите проекты перед удалением.",
         )
-    try:
-        repo.delete_group(group_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Группа не найдена")
 
 
 @app.get("/api/projects", response_model=list[Project])
-def list_projects(
+async def list_projects(
     include_archived: bool = True,
     group_id: UUID | None = None,
     status: list[ProjectStatus] | None = Query(default=None),
@@ -284,12 +410,11 @@ def list_projects(
     current_stage_id: UUID | None = None,
     planned_from: date | None = None,
     planned_to: date | None = None,
-    repo: LocalRepository = Depends(get_repository),
 ) -> list[Project]:
     """Вернуть список проектов с фильтрами по статусу и группе."""
 
-    statuses = set(status) if status else None
-    return repo.list_projects(
+    statuses = status_filter(status)
+    projects = repository.list_projects(
         include_archived=include_archived,
         group_id=group_id,
         statuses=statuses,
@@ -298,21 +423,22 @@ def list_projects(
         planned_from=planned_from,
         planned_to=planned_to,
     )
+    return json_list(PROJECT_LIST_ADAPTER, projects)
 
 
 @app.get("/api/projects/custom-fields/filters", response_model=list[CustomFieldFilterMeta])
-def list_project_field_filters(repo: LocalRepository = Depends(get_repository)) -> list[CustomFieldFilterMeta]:
+async def list_project_field_filters() -> list[CustomFieldFilterMeta]:
     """Вернуть набор пользовательских полей, используемых в нескольких проектах."""
 
-    return repo.list_project_filter_meta()
+    return repository.list_project_filter_meta()
 
 
 @app.post("/api/projects/search", response_model=list[Project])
-def search_projects(payload: ProjectSearchRequest, repo: LocalRepository = Depends(get_repository)) -> list[Project]:
+def search_projects(payload: ProjectSearchRequest) -> list[Project]:
     """Вернуть список проектов с фильтрацией по пользовательским полям."""
 
-    statuses = set(payload.statuses) if payload.statuses else None
-    return repo.list_projects(
+    statuses = status_filter(payload.statuses)
+    projects = repository.list_projects(
         include_archived=payload.include_archived,
         group_id=payload.group_id,
         statuses=statuses,
@@ -322,9 +448,10 @@ def search_projects(payload: ProjectSearchRequest, repo: LocalRepository = Depen
         planned_to=payload.planned_to,
         filters=payload.filters,
     )
+    return json_list(PROJECT_LIST_ADAPTER, projects)
 
 
-@app.get("/api/export/projects", response_class=StreamingResponse)
+@app.get("/api/export/projects", response_class=Response)
 def export_projects(
     include_archived: bool = True,
     status: list[ProjectStatus] | None = Query(default=None),
@@ -332,14 +459,13 @@ def export_projects(
     current_stage_id: UUID | None = None,
     planned_from: date | None = None,
     planned_to: date | None = None,
-    repo: LocalRepository = Depends(get_repository),
-) -> StreamingResponse:
+) -> Response:
     """Экспортировать список проектов в Excel со статусами и основными полями."""
 
-    statuses = set(status) if status else None
+    statuses = status_filter(status)
     export_bytes = export_projects_to_excel(
-        projects=repo.list_projects(include_archived=True),
-        groups=repo.list_groups(include_archived=True),
+        projects=repository.list_projects(include_archived=True),
+        groups=repository.list_groups(include_archived=True),
         statuses=statuses,
         include_archived=include_archived,
         brand=brand,
@@ -348,230 +474,208 @@ def export_projects(
         planned_to=planned_to,
     )
 
-    headers = {"Content-Disposition": "attachment; filename=projects.xlsx"}
-    return StreamingResponse(
-        BytesIO(export_bytes),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers=headers,
-    )
+    return excel_response(export_bytes, "projects.xlsx")
 
 
 @app.post("/api/import/projects", response_model=list[Project], status_code=201)
-async def import_projects(file: UploadFile = File(...), repo: LocalRepository = Depends(get_repository)) -> list[Project]:
+async def import_projects(file: UploadFile = File(...)) -> list[Project]:
     content = await file.read()
     parsed, errors = import_projects_from_excel(
         content,
-        groups=repo.list_groups(include_archived=True),
-        existing_projects=repo.list_projects(include_archived=True),
+        groups=repository.list_groups(include_archived=True),
+        existing_projects=repository.list_projects(include_archived=True),
     )
     if errors:
         raise HTTPException(status_code=400, detail={"message": "Ошибка импорта проектов", "errors": errors})
 
-    projects = repo.import_projects(parsed)
+    projects = repository.import_projects(parsed)
     return projects
 
 
-@app.get("/api/projects/{project_id}/excel", response_class=StreamingResponse)
-def export_full_project(project_id: UUID, repo: LocalRepository = Depends(get_repository)) -> StreamingResponse:
-    project = repo.get_project(project_id)
+@app.get("/api/projects/{project_id}/excel", response_class=Response)
+def export_full_project(project_id: UUID) -> Response:
+    project = repository.get_project(project_id)
     if project is None:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
-    export_bytes = export_project_bundle(project, groups=repo.list_groups(include_archived=True))
-    safe_name = re.sub(r"[\\/*?:\[\]\"<>|]", "_", project.name or "project").strip() or "project"
-    headers = {"Content-Disposition": f"attachment; filename={safe_name}.xlsx"}
-    return StreamingResponse(
-        BytesIO(export_bytes),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers=headers,
-    )
+    export_bytes = export_project_bundle(project, groups=repository.list_groups(include_archived=True))
+    safe_name = FILENAME_FORBIDDEN.sub("_", project.name or "project").strip() or "project"
+    return excel_response(export_bytes, f"{safe_name}.xlsx")
 
 
 @app.post("/api/projects/{project_id}/excel", response_model=Project)
-async def import_full_project(project_id: UUID, file: UploadFile = File(...), repo: LocalRepository = Depends(get_repository)) -> Project:
-    existing = repo.get_project(project_id)
+async def import_full_project(project_id: UUID, file: UploadFile = File(...)) -> Project:
+    existing = repository.get_project(project_id)
     if existing is None:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
     content = await file.read()
-    updated, errors = import_project_bundle_from_excel(content, repo.list_groups(include_archived=True), existing)
+    updated, errors = import_project_bundle_from_excel(content, repository.list_groups(include_archived=True), existing)
     if errors:
         raise HTTPException(status_code=400, detail={"errors": errors})
 
-    saved = repo.replace_project(project_id, updated)
+    saved = repository.replace_project(project_id, updated)
     return saved
 
 
 @app.post("/api/projects", response_model=Project, status_code=201)
-def create_project(project: Project, repo: LocalRepository = Depends(get_repository)) -> Project:
+def create_project(project: Project) -> Project:
     """Создать проект и связать его с группой."""
 
-    if repo.get_group(project.group_id) is None:
+    if repository.get_group(project.group_id) is None:
         raise HTTPException(status_code=400, detail="Указанная продуктовая группа не найдена")
 
-    created = repo.add_project(project)
-    log_event(repo, created.id, "Создан проект", f"Статус: {created.status.value}")
+    created = repository.add_project(project)
+    log_event(repository, created.id, "Создан проект", f"Статус: {created.status.value}")
     return created
 
 
 @app.get("/api/projects/{project_id}", response_model=Project)
-def get_project(project_id: UUID, repo: LocalRepository = Depends(get_repository)) -> Project:
-    project = repo.get_project(project_id)
+async def get_project(project_id: UUID) -> Project:
+    project = repository.get_project(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Проект не найден")
     return project
 
 
 @app.put("/api/projects/{project_id}", response_model=Project)
-def update_project(project_id: UUID, project: Project, repo: LocalRepository = Depends(get_repository)) -> Project:
-    existing = repo.get_project(project_id)
-    if existing is None:
+def update_project(project_id: UUID, project: Project) -> Project:
+    project.id = project_id
+    try:
+        existing, updated = repository.update_project_checked(project_id, project)
+    except ProjectNotFound:
         raise HTTPException(status_code=404, detail="Проект не найден")
-    if repo.get_group(project.group_id) is None:
+    except GroupNotFound:
         raise HTTPException(status_code=400, detail="Указанная продуктовая группа не найдена")
-    aligned_project = project.model_copy(update={"id": project_id})
-    updated = repo.update_project(project_id, aligned_project)
     if existing.status != updated.status:
-        log_event(repo, project_id, "Изменён статус проекта", f"{existing.status.value} → {updated.status.value}")
+        log_event(repository, project_id, "Изменён статус проекта", f"{existing.status.value} → {updated.status.value}")
     return updated
 
 
 @app.delete("/api/projects/{project_id}", status_code=204)
-def delete_project(project_id: UUID, repo: LocalRepository = Depends(get_repository)) -> None:
+def delete_project(project_id: UUID) -> None:
     try:
-        repo.delete_project(project_id)
+        repository.delete_project(project_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
 
 @app.get("/api/gtm-templates", response_model=list[GTMTemplate])
-def list_gtm_templates(repo: LocalRepository = Depends(get_repository)) -> list[GTMTemplate]:
+async def list_gtm_templates() -> list[GTMTemplate]:
     """Вернуть список шаблонов GTM."""
 
-    return repo.list_gtm_templates()
+    return repository.list_gtm_templates()
 
 
 @app.get("/api/gtm-templates/{template_id}", response_model=GTMTemplate)
-def get_gtm_template(template_id: UUID, repo: LocalRepository = Depends(get_repository)) -> GTMTemplate:
-    template = repo.get_gtm_template(template_id)
+async def get_gtm_template(template_id: UUID) -> GTMTemplate:
+    template = repository.get_gtm_template(template_id)
     if not template:
         raise HTTPException(status_code=404, detail="Шаблон GTM не найден")
     return template
 
 
 @app.post("/api/gtm-templates", response_model=GTMTemplate, status_code=201)
-def create_gtm_template(template: GTMTemplate, repo: LocalRepository = Depends(get_repository)) -> GTMTemplate:
-    return repo.add_gtm_template(template)
+def create_gtm_template(template: GTMTemplate) -> GTMTemplate:
+    return repository.add_gtm_template(template)
 
 
 @app.put("/api/gtm-templates/{template_id}", response_model=GTMTemplate)
-def update_gtm_template(template_id: UUID, template: GTMTemplate, repo: LocalRepository = Depends(get_repository)) -> GTMTemplate:
-    if repo.get_gtm_template(template_id) is None:
+def update_gtm_template(template_id: UUID, template: GTMTemplate) -> GTMTemplate:
+    if repository.get_gtm_template(template_id) is None:
         raise HTTPException(status_code=404, detail="Шаблон GTM не найден")
-    aligned = template.model_copy(update={"id": template_id})
-    return repo.update_gtm_template(template_id, aligned)
+    template.id = template_id
+    return repository.update_gtm_template(template_id, template)
 
 
 @app.delete("/api/gtm-templates/{template_id}", status_code=204)
-def delete_gtm_template(template_id: UUID, repo: LocalRepository = Depends(get_repository)) -> None:
+def delete_gtm_template(template_id: UUID) -> None:
     try:
-        repo.delete_gtm_template(template_id)
+        repository.delete_gtm_template(template_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Шаблон GTM не найден")
 
 
 @app.get("/api/characteristic-templates", response_model=list[CharacteristicTemplate])
-def list_characteristic_templates(repo: LocalRepository = Depends(get_repository)) -> list[CharacteristicTemplate]:
+async def list_characteristic_templates() -> list[CharacteristicTemplate]:
     """Вернуть список шаблонов характеристик."""
 
-    return repo.list_characteristic_templates()
+    return repository.list_characteristic_templates()
 
 
 @app.get("/api/characteristic-templates/{template_id}", response_model=CharacteristicTemplate)
-def get_characteristic_template(template_id: UUID, repo: LocalRepository = Depends(get_repository)) -> CharacteristicTemplate:
-    template = repo.get_characteristic_template(template_id)
+async def get_characteristic_template(template_id: UUID) -> CharacteristicTemplate:
+    template = repository.get_characteristic_template(template_id)
     if not template:
         raise HTTPException(status_code=404, detail="Шаблон характеристик не найден")
     return template
 
 
 @app.post("/api/characteristic-templates", response_model=CharacteristicTemplate, status_code=201)
-def create_characteristic_template(
-    template: CharacteristicTemplate, repo: LocalRepository = Depends(get_repository)
-) -> CharacteristicTemplate:
-    return repo.add_characteristic_template(template)
+def create_characteristic_template(template: CharacteristicTemplate) -> CharacteristicTemplate:
+    return repository.add_characteristic_template(template)
 
 
 @app.put("/api/characteristic-templates/{template_id}", response_model=CharacteristicTemplate)
-def update_characteristic_template(
-    template_id: UUID, template: CharacteristicTemplate, repo: LocalRepository = Depends(get_repository)
-) -> CharacteristicTemplate:
-    if repo.get_characteristic_template(template_id) is None:
+def update_characteristic_template(template_id: UUID, template: CharacteristicTemplate) -> CharacteristicTemplate:
+    if repository.get_characteristic_template(template_id) is None:
         raise HTTPException(status_code=404, detail="Шаблон характеристик не найден")
-    aligned = template.model_copy(update={"id": template_id})
-    return repo.update_characteristic_template(template_id, aligned)
+    template.id = template_id
+    return repository.update_characteristic_template(template_id, template)
 
 
 @app.delete("/api/characteristic-templates/{template_id}", status_code=204)
-def delete_characteristic_template(template_id: UUID, repo: LocalRepository = Depends(get_repository)) -> None:
+def delete_characteristic_template(template_id: UUID) -> None:
     try:
-        repo.delete_characteristic_template(template_id)
+        repository.delete_characteristic_template(template_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Шаблон характеристик не найден")
 
 
 @app.get("/api/projects/{project_id}/gtm-stages", response_model=list[GTMStage])
-def list_gtm_stages(project_id: UUID, repo: LocalRepository = Depends(get_repository)) -> list[GTMStage]:
+async def list_gtm_stages(project_id: UUID) -> list[GTMStage]:
     try:
-        return repo.list_gtm_stages(project_id)
+        stages = repository.list_gtm_stages(project_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
+    return json_list(GTM_STAGE_LIST_ADAPTER, stages)
 
 
 @app.post("/api/projects/{project_id}/gtm-stages", response_model=GTMStage, status_code=201)
-def create_gtm_stage(project_id: UUID, stage: GTMStage, repo: LocalRepository = Depends(get_repository)) -> GTMStage:
+def create_gtm_stage(project_id: UUID, stage: GTMStage) -> GTMStage:
     try:
-        created = repo.add_gtm_stage(project_id, stage)
-        log_event(repo, project_id, "Добавлен GTM-этап", created.title)
+        created = repository.add_gtm_stage(project_id, stage)
+        log_event(repository, project_id, "Добавлен GTM-этап", created.title)
         return created
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
 
 @app.put("/api/projects/{project_id}/gtm-stages/{stage_id}", response_model=GTMStage)
-def update_gtm_stage(project_id: UUID, stage_id: UUID, stage: GTMStage, repo: LocalRepository = Depends(get_repository)) -> GTMStage:
-    existing = next((item for item in repo.list_gtm_stages(project_id) if item.id == stage_id), None)
-    if existing is None:
-        raise HTTPException(status_code=404, detail="Этап GTM не найден")
-
-    aligned = stage.model_copy(update={"id": stage_id})
+def update_gtm_stage(project_id: UUID, stage_id: UUID, stage: GTMStage) -> GTMStage:
     try:
-        updated = repo.update_gtm_stage(project_id, stage_id, aligned)
-        if existing.status != updated.status:
-            log_event(
-                repo,
-                project_id,
-                "Изменён статус GTM-этапа",
-                f"{existing.title}: {existing.status.value} → {updated.status.value}",
-            )
-        return updated
+        existing, updated = repository.update_gtm_stage_checked(project_id, stage_id, stage)
     except KeyError as exc:
-        if "Project" in str(exc):
-            raise HTTPException(status_code=404, detail="Проект не найден")
-        raise HTTPException(status_code=404, detail="Этап GTM не найден")
+        raise not_found(exc)
+    if existing.status != updated.status:
+        log_event(
+            repository,
+            project_id,
+            "Изменён статус GTM-этапа",
+            f"{existing.title}: {existing.status.value} → {updated.status.value}",
+        )
+    return updated
 
 
 @app.delete("/api/projects/{project_id}/gtm-stages/{stage_id}", status_code=204)
-def delete_gtm_stage(project_id: UUID, stage_id: UUID, repo: LocalRepository = Depends(get_repository)) -> None:
-    stage = next((item for item in repo.list_gtm_stages(project_id) if item.id == stage_id), None)
+def delete_gtm_stage(project_id: UUID, stage_id: UUID) -> None:
+    stage = next((item for item in repository.list_gtm_stages(project_id) if item.id == stage_id), None)
     try:
-        repo.delete_gtm_stage(project_id, stage_id)
+        repository.delete_gtm_stage(project_id, stage_id)
         if stage:
-            log_event(repo, project_id, "Удалён GTM-этап", stage.title)
+            log_event(repository, project_id, "Удалён GTM-этап", stage.title)
     except KeyError as exc:
-        if "Project" in str(exc):
-            raise HTTPException(status_code=404, detail="Проект не найден")
-        raise HTTPException(status_code=404, detail="Этап GTM не найден")
+        raise not_found(exc)
 
 
 @app.post(
@@ -579,16 +683,14 @@ def delete_gtm_stage(project_id: UUID, stage_id: UUID, repo: LocalRepository = D
     response_model=list[GTMStage],
     status_code=201,
 )
-def apply_gtm_template(project_id: UUID, template_id: UUID, repo: LocalRepository = Depends(get_repository)) -> list[GTMStage]:
+def apply_gtm_template(project_id: UUID, template_id: UUID) -> list[GTMStage]:
     try:
-        stages = repo.apply_gtm_template(project_id, template_id)
-        log_event(repo, project_id, "Применён шаблон GTM")
+        with repository.batch():
+            stages = repository.apply_gtm_template(project_id, template_id)
+            log_event(repository, project_id, "Применён шаблон GTM")
         return stages
     except KeyError as exc:
-        message = str(exc)
-        if "Project" in message:
-            raise HTTPException(status_code=404, detail="Проект не найден")
-        raise HTTPException(status_code=404, detail="Шаблон GTM не найден")
+        raise not_found(exc)
 
 
 @app.post(
@@ -596,10 +698,8 @@ def apply_gtm_template(project_id: UUID, template_id: UUID, repo: LocalRepositor
     response_model=list[GTMStage],
     status_code=201,
 )
-async def import_gtm_stages(
-    project_id: UUID, file: UploadFile = File(...), repo: LocalRepository = Depends(get_repository)
-) -> list[GTMStage]:
-    if repo.get_project(project_id) is None:
+async def import_gtm_stages(project_id: UUID, file: UploadFile = File(...)) -> list[GTMStage]:
+    if repository.get_project(project_id) is None:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
     content = await file.read()
@@ -607,24 +707,19 @@ async def import_gtm_stages(
     if errors:
         raise HTTPException(status_code=400, detail={"message": "Ошибка импорта GTM", "errors": errors})
 
-    stages = repo.replace_gtm_stages(project_id, stages, imported_tasks)
-    log_event(repo, project_id, "Импортированы GTM-этапы (Excel)")
+    stages = repository.replace_gtm_stages(project_id, stages, imported_tasks)
+    log_event(repository, project_id, "Импортированы GTM-этапы (Excel)")
     return stages
 
 
 @app.get("/api/projects/{project_id}/gtm-stages/export")
-def export_gtm_stages(project_id: UUID, repo: LocalRepository = Depends(get_repository)) -> StreamingResponse:
-    project = repo.get_project(project_id)
+def export_gtm_stages(project_id: UUID) -> Response:
+    project = repository.get_project(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
     payload = export_gtm_stages_to_excel(project)
-    headers = {"Content-Disposition": f"attachment; filename=gtm_stages_{project_id}.xlsx"}
-    return StreamingResponse(
-        BytesIO(payload),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers=headers,
-    )
+    return excel_response(payload, f"gtm_stages_{project_id}.xlsx")
 
 
 @app.post(
@@ -632,11 +727,9 @@ def export_gtm_stages(project_id: UUID, repo: LocalRepository = Depends(get_repo
     response_model=GTMTemplate,
     status_code=201,
 )
-def save_gtm_template_from_project(
-    project_id: UUID, payload: TemplateFromProjectRequest, repo: LocalRepository = Depends(get_repository)
-) -> GTMTemplate:
+def save_gtm_template_from_project(project_id: UUID, payload: TemplateFromProjectRequest) -> GTMTemplate:
     try:
-        return repo.create_gtm_template_from_project(project_id, payload.name, payload.description)
+        return repository.create_gtm_template_from_project(project_id, payload.name, payload.description)
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
@@ -645,11 +738,12 @@ def save_gtm_template_from_project(
     "/api/projects/{project_id}/characteristics/sections",
     response_model=list[CharacteristicSection],
 )
-def list_characteristic_sections(project_id: UUID, repo: LocalRepository = Depends(get_repository)) -> list[CharacteristicSection]:
+async def list_characteristic_sections(project_id: UUID) -> list[CharacteristicSection]:
     try:
-        return repo.list_characteristic_sections(project_id)
+        sections = repository.list_characteristic_sections(project_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
+    return json_list(SECTION_LIST_ADAPTER, sections)
 
 
 @app.post(
@@ -657,12 +751,10 @@ def list_characteristic_sections(project_id: UUID, repo: LocalRepository = Depen
     response_model=CharacteristicSection,
     status_code=201,
 )
-def create_characteristic_section(
-    project_id: UUID, section: CharacteristicSection, repo: LocalRepository = Depends(get_repository)
-) -> CharacteristicSection:
+def create_characteristic_section(project_id: UUID, section: CharacteristicSection) -> CharacteristicSection:
     try:
-        created = repo.add_characteristic_section(project_id, section)
-        log_event(repo, project_id, "Добавлена секция характеристик", created.title)
+        created = repository.add_characteristic_section(project_id, section)
+        log_event(repository, project_id, "Добавлена секция характеристик", created.title)
         return created
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
@@ -676,33 +768,28 @@ def update_characteristic_section(
     project_id: UUID,
     section_id: UUID,
     section: CharacteristicSection,
-    repo: LocalRepository = Depends(get_repository),
 ) -> CharacteristicSection:
-    aligned = section.model_copy(update={"id": section_id})
+    section.id = section_id
     try:
-        updated = repo.update_characteristic_section(project_id, section_id, aligned)
-        log_event(repo, project_id, "Обновлена секция характеристик", updated.title)
+        updated = repository.update_characteristic_section(project_id, section_id, section)
+        log_event(repository, project_id, "Обновлена секция характеристик", updated.title)
         return updated
     except KeyError as exc:
-        if "Project" in str(exc):
-            raise HTTPException(status_code=404, detail="Проект не найден")
-        raise HTTPException(status_code=404, detail="Секция характеристик не найдена")
+        raise not_found(exc)
 
 
 @app.delete(
     "/api/projects/{project_id}/characteristics/sections/{section_id}",
     status_code=204,
 )
-def delete_characteristic_section(project_id: UUID, section_id: UUID, repo: LocalRepository = Depends(get_repository)) -> None:
-    section = next((item for item in repo.list_characteristic_sections(project_id) if item.id == section_id), None)
+def delete_characteristic_section(project_id: UUID, section_id: UUID) -> None:
+    section = next((item for item in repository.list_characteristic_sections(project_id) if item.id == section_id), None)
     try:
-        repo.delete_characteristic_section(project_id, section_id)
+        repository.delete_characteristic_section(project_id, section_id)
         if section:
-            log_event(repo, project_id, "Удалена секция характеристик", section.title)
+            log_event(repository, project_id, "Удалена секция характеристик", section.title)
     except KeyError as exc:
-        if "Project" in str(exc):
-            raise HTTPException(status_code=404, detail="Проект не найден")
-        raise HTTPException(status_code=404, detail="Секция характеристик не найдена")
+        raise not_found(exc)
 
 
 @app.post(
@@ -714,16 +801,13 @@ def create_characteristic_field(
     project_id: UUID,
     section_id: UUID,
     field: CharacteristicField,
-    repo: LocalRepository = Depends(get_repository),
 ) -> CharacteristicField:
     try:
-        created = repo.add_characteristic_field(project_id, section_id, field)
-        log_event(repo, project_id, "Добавлено поле характеристики", created.label_ru)
+        created = repository.add_characteristic_field(project_id, section_id, field)
+        log_event(repository, project_id, "Добавлено поле характеристики", created.label_ru)
         return created
     except KeyError as exc:
-        if "Project" in str(exc):
-            raise HTTPException(status_code=404, detail="Проект не найден")
-        raise HTTPException(status_code=404, detail="Секция характеристик не найдена")
+        raise not_found(exc)
 
 
 @app.put(
@@ -735,45 +819,32 @@ def update_characteristic_field(
     section_id: UUID,
     field_id: UUID,
     field: CharacteristicField,
-    repo: LocalRepository = Depends(get_repository),
 ) -> CharacteristicField:
-    aligned = field.model_copy(update={"id": field_id})
+    field.id = field_id
     try:
-        updated = repo.update_characteristic_field(project_id, section_id, field_id, aligned)
-        log_event(repo, project_id, "Обновлено поле характеристики", updated.label_ru)
+        updated = repository.update_characteristic_field(project_id, section_id, field_id, field)
+        log_event(repository, project_id, "Обновлено поле характеристики", updated.label_ru)
         return updated
     except KeyError as exc:
-        message = str(exc)
-        if "Project" in message:
-            raise HTTPException(status_code=404, detail="Проект не найден")
-        if "section" in message.lower():
-            raise HTTPException(status_code=404, detail="Секция характеристик не найдена")
-        raise HTTPException(status_code=404, detail="Поле характеристики не найдено")
+        raise not_found(exc)
 
 
 @app.delete(
     "/api/projects/{project_id}/characteristics/sections/{section_id}/fields/{field_id}",
     status_code=204,
 )
-def delete_characteristic_field(
-    project_id: UUID, section_id: UUID, field_id: UUID, repo: LocalRepository = Depends(get_repository)
-) -> None:
+def delete_characteristic_field(project_id: UUID, section_id: UUID, field_id: UUID) -> None:
     field = None
-    for section in repo.list_characteristic_sections(project_id):
+    for section in repository.list_characteristic_sections(project_id):
         if section.id == section_id:
             field = next((item for item in section.fields if item.id == field_id), None)
             break
     try:
-        repo.delete_characteristic_field(project_id, section_id, field_id)
+        repository.delete_characteristic_field(project_id, section_id, field_id)
         if field:
-            log_event(repo, project_id, "Удалено поле характеристики", field.label_ru)
+            log_event(repository, project_id, "Удалено поле характеристики", field.label_ru)
     except KeyError as exc:
-        message = str(exc)
-        if "Project" in message:
-            raise HTTPException(status_code=404, detail="Проект не найден")
-        if "section" in message.lower():
-            raise HTTPException(status_code=404, detail="Секция характеристик не найдена")
-        raise HTTPException(status_code=404, detail="Поле характеристики не найдено")
+        raise not_found(exc)
 
 
 @app.post(
@@ -781,18 +852,14 @@ def delete_characteristic_field(
     response_model=list[CharacteristicSection],
     status_code=201,
 )
-def apply_characteristic_template(
-    project_id: UUID, template_id: UUID, repo: LocalRepository = Depends(get_repository)
-) -> list[CharacteristicSection]:
+def apply_characteristic_template(project_id: UUID, template_id: UUID) -> list[CharacteristicSection]:
     try:
-        sections = repo.apply_characteristic_template(project_id, template_id)
-        log_event(repo, project_id, "Применён шаблон характеристик")
+        with repository.batch():
+            sections = repository.apply_characteristic_template(project_id, template_id)
+            log_event(repository, project_id, "Применён шаблон характеристик")
         return sections
     except KeyError as exc:
-        message = str(exc)
-        if "Project" in message:
-            raise HTTPException(status_code=404, detail="Проект не найден")
-        raise HTTPException(status_code=404, detail="Шаблон характеристик не найден")
+        raise not_found(exc)
 
 
 @app.post(
@@ -800,33 +867,28 @@ def apply_characteristic_template(
     response_model=list[CharacteristicSection],
     status_code=201,
 )
-def copy_characteristics_structure(
-    project_id: UUID, source_project_id: UUID, repo: LocalRepository = Depends(get_repository)
-) -> list[CharacteristicSection]:
+def copy_characteristics_structure(project_id: UUID, source_project_id: UUID) -> list[CharacteristicSection]:
     try:
-        sections = repo.copy_characteristics_structure(project_id, source_project_id)
-        log_event(repo, project_id, "Скопирована структура характеристик")
-        return sections
+        with repository.batch():
+            sections = repository.copy_characteristics_structure(project_id, source_project_id)
+            log_event(repository, project_id, "Скопирована структура характеристик")
     except KeyError as exc:
-        message = str(exc)
-        if "Project" in message and str(project_id) in message:
-            raise HTTPException(status_code=404, detail="Целевой проект не найден")
-    raise HTTPException(status_code=404, detail="Проект-источник не найден")
+        raise not_found(exc)
+    return sections
 
 
 @app.get("/api/projects/{project_id}/characteristics/export")
-def export_characteristics(project_id: UUID, repo: LocalRepository = Depends(get_repository)):
+def export_characteristics(project_id: UUID):
     """Выгрузить характеристики проекта в Excel."""
 
     try:
-        project = repo.get_project(project_id)
+        project = repository.get_project(project_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
     content = export_characteristics_to_excel(project)
     filename = f"characteristics_{project_id}_{date.today().isoformat()}.xlsx"
-    headers = {"Content-Disposition": f"attachment; filename={filename}"}
-    return StreamingResponse(BytesIO(content), media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", headers=headers)
+    return excel_response(content, filename)
 
 
 @app.post(
@@ -834,31 +896,28 @@ def export_characteristics(project_id: UUID, repo: LocalRepository = Depends(get
     response_model=CharacteristicImportResponse,
     status_code=201,
 )
-def import_characteristics(
-    project_id: UUID, file: UploadFile = File(...), repo: LocalRepository = Depends(get_repository)
-) -> CharacteristicImportResponse:
+def import_characteristics(project_id: UUID, file: UploadFile = File(...)) -> CharacteristicImportResponse:
     content = file.file.read()
-    sections, errors, report = repo.import_characteristics_from_excel(project_id, content)
+    sections, errors, report = repository.import_characteristics_from_excel(project_id, content)
     if errors:
         raise HTTPException(status_code=400, detail={"errors": errors})
-    log_event(repo, project_id, "Импортированы характеристики (Excel)")
+    log_event(repository, project_id, "Импортированы характеристики (Excel)")
     return CharacteristicImportResponse(sections=sections, report=report)
 
 
 @app.get("/api/characteristics/overview", response_model=list[CharacteristicFlatRecord])
-def list_characteristics_overview(
-    group_id: UUID | None = None, search: str | None = None, repo: LocalRepository = Depends(get_repository)
+async def list_characteristics_overview(
+    group_id: UUID | None = None, search: str | None = None
 ) -> list[CharacteristicFlatRecord]:
-    return repo.list_characteristics_overview(group_id=group_id, query=search)
+    return repository.list_characteristics_overview(group_id=group_id, query=search)
 
 
-@app.get("/api/characteristics/export-all", response_class=StreamingResponse)
+@app.get("/api/characteristics/export-all", response_class=Response)
 def export_all_characteristics_excel(
     group_id: UUID | None = None,
     project_ids: list[UUID] | None = Query(default=None),
-    repo: LocalRepository = Depends(get_repository),
-) -> StreamingResponse:
-    projects = repo.list_projects(include_archived=True)
+) -> Response:
+    projects = repository.list_projects(include_archived=True)
     if group_id:
         projects = [p for p in projects if p.group_id == group_id]
     if project_ids:
@@ -867,58 +926,49 @@ def export_all_characteristics_excel(
         project_filter = None
     export_bytes = export_all_characteristics(
         projects=projects,
-        groups=repo.list_groups(include_archived=True),
+        groups=repository.list_groups(include_archived=True),
         project_filter=project_filter,
     )
-    headers = {"Content-Disposition": "attachment; filename=characteristics.xlsx"}
-    return StreamingResponse(
-        BytesIO(export_bytes),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers=headers,
-    )
+    return excel_response(export_bytes, "characteristics.xlsx")
 
 
 @app.post("/api/characteristics/import-all", status_code=201)
-async def import_all_characteristics_excel(
-    file: UploadFile = File(...), repo: LocalRepository = Depends(get_repository)
-) -> dict[str, int]:
+async def import_all_characteristics_excel(file: UploadFile = File(...)) -> dict[str, int]:
     content = await file.read()
-    updates, errors = import_characteristics_bulk(content, repo.list_projects(include_archived=True))
+    updates, errors = import_characteristics_bulk(content, repository.list_projects(include_archived=True))
     if errors:
         raise HTTPException(status_code=400, detail={"errors": errors})
-    repo.apply_characteristics_bulk(updates)
+    repository.apply_characteristics_bulk(updates)
     return {"updated": len(updates)}
 
 
 @app.get("/api/projects/{project_id}/tasks", response_model=list[Task])
-def list_tasks(
+async def list_tasks(
     project_id: UUID,
     status: list[TaskStatus] | None = Query(default=None),
     only_active: bool = False,
     gtm_stage_id: UUID | None = None,
-    repo: LocalRepository = Depends(get_repository),
 ) -> list[Task]:
     """Вернуть задачи проекта с базовыми фильтрами."""
 
-    statuses = set(status) if status else None
+    statuses = status_filter(status)
     try:
-        return repo.list_tasks(project_id, statuses=statuses, only_active=only_active, gtm_stage_id=gtm_stage_id)
+        tasks = repository.list_tasks(project_id, statuses=statuses, only_active=only_active, gtm_stage_id=gtm_stage_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
+    return json_list(TASK_LIST_ADAPTER, tasks)
 
 
 @app.get("/api/tasks/priority-summary", response_model=TaskSpotlightSummary)
-def get_priority_tasks(
-    include_archived_projects: bool = False, repo: LocalRepository = Depends(get_repository)
-) -> TaskSpotlightSummary:
-    return repo.build_priority_task_summary(include_archived_projects=include_archived_projects)
+async def get_priority_tasks(include_archived_projects: bool = False) -> TaskSpotlightSummary:
+    return repository.build_priority_task_summary(include_archived_projects=include_archived_projects)
 
 
 @app.post("/api/projects/{project_id}/tasks", response_model=Task, status_code=201)
-def create_task(project_id: UUID, task: Task, repo: LocalRepository = Depends(get_repository)) -> Task:
+def create_task(project_id: UUID, task: Task) -> Task:
     try:
-        created = repo.add_task(project_id, task)
-        log_event(repo, project_id, "Добавлена задача", created.title)
+        created = repository.add_task(project_id, task)
+        log_event(repository, project_id, "Добавлена задача", created.title)
         return created
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
@@ -928,36 +978,22 @@ def create_task(project_id: UUID, task: Task, repo: LocalRepository = Depends(ge
 
 
 @app.put("/api/projects/{project_id}/tasks/{task_id}", response_model=Task)
-def update_task(project_id: UUID, task_id: UUID, task: Task, repo: LocalRepository = Depends(get_repository)) -> Task:
-    try:
-        existing = next((item for item in repo.list_tasks(project_id) if item.id == task_id), None)
-    except KeyError:
-        raise HTTPException(status_code=404, detail="Проект не найден")
-    if existing is None:
-        raise HTTPException(status_code=404, detail="Задача не найдена")
-
-    aligned = task.model_copy(
-        update={
-            "id": task_id,
-            "subtasks": existing.subtasks,
-            "comments": existing.comments,
-        }
-    )
+def update_task(project_id: UUID, task_id: UUID, task: Task) -> Task:
     try:
-        updated = repo.update_task(project_id, task_id, aligned)
+        existing, updated = repository.replace_task_fields(project_id, task_id, task)
         if existing.status != updated.status:
             log_event(
-                repo,
+                repository,
                 project_id,
                 "Изменён статус задачи",
                 f"{existing.title}: {existing.status.value} → {updated.status.value}",
             )
         else:
-            log_event(repo, project_id, "Обновлена задача", updated.title)
+            log_event(repository, project_id, "Обновлена задача", updated.title)
         return updated
-    except KeyError as exc:
-        if "Project" in str(exc):
-            raise HTTPException(status_code=404, detail="Проект не найден")
+    except ProjectNotFound:
+        raise HTTPException(status_code=404, detail="Проект не найден")
+    except TaskNotFound:
         raise HTTPException(status_code=404, detail="Задача не найдена")
     except ValueError as exc:
         reason = "Укажите GTM-этап для задачи" if "gtm_stage_required" in str(exc) else "Указанный GTM-этап не найден"
@@ -965,31 +1001,27 @@ def update_task(project_id: UUID, task_id: UUID, task: Task, repo: LocalReposito
 
 
 @app.delete("/api/projects/{project_id}/tasks/{task_id}", status_code=204)
-def delete_task(project_id: UUID, task_id: UUID, repo: LocalRepository = Depends(get_repository)) -> None:
+def delete_task(project_id: UUID, task_id: UUID) -> None:
     try:
-        task = next((item for item in repo.list_tasks(project_id) if item.id == task_id), None)
+        task = next((item for item in repository.list_tasks(project_id) if item.id == task_id), None)
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
     try:
-        repo.delete_task(project_id, task_id)
+        repository.delete_task(project_id, task_id)
         if task:
-            log_event(repo, project_id, "Удалена задача", task.title)
+            log_event(repository, project_id, "Удалена задача", task.title)
     except KeyError as exc:
-        if "Project" in str(exc):
-            raise HTTPException(status_code=404, detail="Проект не найден")
-        raise HTTPException(status_code=404, detail="Задача не найдена")
+        raise not_found(exc)
 
 
 @app.post("/api/projects/{project_id}/tasks/{task_id}/subtasks", response_model=Subtask, status_code=201)
-def create_subtask(project_id: UUID, task_id: UUID, subtask: Subtask, repo: LocalRepository = Depends(get_repository)) -> Subtask:
+def create_subtask(project_id: UUID, task_id: UUID, subtask: Subtask) -> Subtask:
     try:
-        created = repo.add_subtask(project_id, task_id, subtask)
-        log_event(repo, project_id, "Добавлена подзадача", created.title)
+        created = repository.add_subtask(project_id, task_id, subtask)
+        log_event(repository, project_id, "Добавлена подзадача", created.title)
         return created
     except KeyError as exc:
-        if "Project" in str(exc):
-            raise HTTPException(status_code=404, detail="Проект не найден")
-        raise HTTPException(status_code=404, detail="Задача не найдена")
+        raise not_found(exc)
 
 
 @app.put("/api/projects/{project_id}/tasks/{task_id}/subtasks/{subtask_id}", response_model=Subtask)
@@ -998,27 +1030,20 @@ def update_subtask(
     task_id: UUID,
     subtask_id: UUID,
     subtask: Subtask,
-    repo: LocalRepository = Depends(get_repository),
 ) -> Subtask:
-    aligned = subtask.model_copy(update={"id": subtask_id})
     try:
-        updated = repo.update_subtask(project_id, task_id, subtask_id, aligned)
-        log_event(repo, project_id, "Обновлена подзадача", updated.title)
-        return updated
+        _, updated = repository.update_subtask_checked(project_id, task_id, subtask_id, subtask)
     except KeyError as exc:
-        message = str(exc)
-        if "Project" in message:
-            raise HTTPException(status_code=404, detail="Проект не найден")
-        if "Task" in message:
-            raise HTTPException(status_code=404, detail="Задача не найдена")
-        raise HTTPException(status_code=404, detail="Подзадача не найдена")
+        raise not_found(exc)
+    log_event(repository, project_id, "Обновлена подзадача", updated.title)
+    return updated
 
 
 @app.delete("/api/projects/{project_id}/tasks/{task_id}/subtasks/{subtask_id}", status_code=204)
-def delete_subtask(project_id: UUID, task_id: UUID, subtask_id: UUID, repo: LocalRepository = Depends(get_repository)) -> None:
+def delete_subtask(project_id: UUID, task_id: UUID, subtask_id: UUID) -> None:
     subtask_obj = None
     try:
-        tasks = repo.list_tasks(project_id)
+        tasks = repository.list_tasks(project_id)
         for task in tasks:
             if task.id == task_id:
                 subtask_obj = next((item for item in task.subtasks if item.id == subtask_id), None)
@@ -1026,22 +1051,17 @@ def delete_subtask(project_id: UUID, task_id: UUID, subtask_id: UUID, repo: Loca
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
     try:
-        repo.delete_subtask(project_id, task_id, subtask_id)
+        repository.delete_subtask(project_id, task_id, subtask_id)
         if subtask_obj:
-            log_event(repo, project_id, "Удалена подзадача", subtask_obj.title)
+            log_event(repository, project_id, "Удалена подзадача", subtask_obj.title)
     except KeyError as exc:
-        message = str(exc)
-        if "Project" in message:
-            raise HTTPException(status_code=404, detail="Проект не найден")
-        if "Task" in message:
-            raise HTTPException(status_code=404, detail="Задача не найдена")
-        raise HTTPException(status_code=404, detail="Подзадача не найдена")
+        raise not_found(exc)
 
 
 @app.get("/api/projects/{project_id}/files", response_model=list[FileAttachment])
-def list_files(project_id: UUID, repo: LocalRepository = Depends(get_repository)) -> list[FileAttachment]:
+async def list_files(project_id: UUID) -> list[FileAttachment]:
     try:
-        return repo.list_files(project_id)
+        return repository.list_files(project_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
@@ -1056,9 +1076,8 @@ def upload_file(
     file: UploadFile = File(...),
     description: str | None = Form(default=None),
     category: str | None = Form(default=None),
-    repo: LocalRepository = Depends(get_repository),
 ) -> FileAttachment:
-    if repo.get_project(project_id) is None:
+    if repository.get_project(project_id) is None:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
     stored_path = save_uploaded_file(file, settings.files_dir / str(project_id))
@@ -1068,38 +1087,36 @@ def upload_file(
         category=category,
         path=stored_path,
     )
-    created = repo.add_file(project_id, attachment)
-    log_event(repo, project_id, "Загружен файл", created.name)
+    created = repository.add_file(project_id, attachment)
+    log_event(repository, project_id, "Загружен файл", created.name)
     return created
 
 
 @app.post("/api/projects/{project_id}/files", response_model=FileAttachment, status_code=201)
-def add_file(project_id: UUID, file: FileAttachment, repo: LocalRepository = Depends(get_repository)) -> FileAttachment:
+def add_file(project_id: UUID, file: FileAttachment) -> FileAttachment:
     try:
-        created = repo.add_file(project_id, file)
-        log_event(repo, project_id, "Добавлен файл", created.name)
+        created = repository.add_file(project_id, file)
+        log_event(repository, project_id, "Добавлен файл", created.name)
         return created
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
 
 @app.put("/api/projects/{project_id}/files/{file_id}", response_model=FileAttachment)
-def update_file(
-    project_id: UUID, file_id: UUID, file: FileAttachment, repo: LocalRepository = Depends(get_repository)
-) -> FileAttachment:
-    aligned = file.model_copy(update={"id": file_id})
+def update_file(project_id: UUID, file_id: UUID, file: FileAttachment) -> FileAttachment:
+    file.id = file_id
     try:
-        updated = repo.update_file(project_id, file_id, aligned)
-        log_event(repo, project_id, "Обновлены данные файла", updated.name)
+        updated = repository.update_file(project_id, file_id, file)
+        log_event(repository, project_id, "Обновлены данные файла", updated.name)
         return updated
     except KeyError:
         raise HTTPException(status_code=404, detail="Файл не найден или проект не существует")
 
 
 @app.delete("/api/projects/{project_id}/files/{file_id}", status_code=204)
-def delete_file(project_id: UUID, file_id: UUID, repo: LocalRepository = Depends(get_repository)) -> None:
+def delete_file(project_id: UUID, file_id: UUID) -> None:
     try:
-        attachment = next((item for item in repo.list_files(project_id) if item.id == file_id), None)
+        attachment = next((item for item in repository.list_files(project_id) if item.id == file_id), None)
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
@@ -1108,18 +1125,18 @@ def delete_file(project_id: UUID, file_id: UUID, repo: LocalRepository = Depends
 
     stored_path = resolve_storage_path(attachment.path)
     try:
-        repo.delete_file(project_id, file_id)
+        repository.delete_file(project_id, file_id)
         if stored_path.exists():
             stored_path.unlink()
-        log_event(repo, project_id, "Удалён файл", attachment.name)
+        log_event(repository, project_id, "Удалён файл", attachment.name)
     except KeyError:
         raise HTTPException(status_code=404, detail="Файл не найден или проект не существует")
 
 
 @app.get("/api/projects/{project_id}/files/{file_id}/download")
-def download_file(project_id: UUID, file_id: UUID, repo: LocalRepository = Depends(get_repository)) -> FileResponse:
+def download_file(project_id: UUID, file_id: UUID) -> FileResponse:
     try:
-        attachment = next((item for item in repo.list_files(project_id) if item.id == file_id), None)
+        attachment = next((item for item in repository.list_files(project_id) if item.id == file_id), None)
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
@@ -1134,9 +1151,9 @@ def download_file(project_id: UUID, file_id: UUID, repo: LocalRepository = Depen
 
 
 @app.get("/api/projects/{project_id}/images", response_model=list[ImageAttachment])
-def list_images(project_id: UUID, repo: LocalRepository = Depends(get_repository)) -> list[ImageAttachment]:
+async def list_images(project_id: UUID) -> list[ImageAttachment]:
     try:
-        return repo.list_images(project_id)
+        return repository.list_images(project_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
@@ -1151,13 +1168,12 @@ def upload_image(
     file: UploadFile = File(...),
     caption: str | None = Form(default=None),
     is_cover: bool = Form(default=False),
-    repo: LocalRepository = Depends(get_repository),
 ) -> ImageAttachment:
-    if repo.get_project(project_id) is None:
+    if repository.get_project(project_id) is None:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
     stored_path, preview_path = save_image_with_preview(file, settings.images_dir / str(project_id))
-    order = len(repo.list_images(project_id))
+    order = len(repository.list_images(project_id))
     image = ImageAttachment(
         filename=file.filename or "image",
         caption=caption,
@@ -1166,44 +1182,42 @@ def upload_image(
         path=stored_path,
         preview_path=preview_path,
     )
-    created = repo.add_image(project_id, image)
+    created = repository.add_image(project_id, image)
     if created.is_cover:
-        log_event(repo, project_id, "Назначена обложка проекта", created.filename)
+        log_event(repository, project_id, "Назначена обложка проекта", created.filename)
     else:
-        log_event(repo, project_id, "Добавлено изображение", created.filename)
+        log_event(repository, project_id, "Добавлено изображение", created.filename)
     return created
 
 
 @app.post("/api/projects/{project_id}/images", response_model=ImageAttachment, status_code=201)
-def add_image(project_id: UUID, image: ImageAttachment, repo: LocalRepository = Depends(get_repository)) -> ImageAttachment:
+def add_image(project_id: UUID, image: ImageAttachment) -> ImageAttachment:
     try:
-        created = repo.add_image(project_id, image)
-        log_event(repo, project_id, "Добавлено изображение", created.filename)
+        created = repository.add_image(project_id, image)
+        log_event(repository, project_id, "Добавлено изображение", created.filename)
         return created
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
 
 @app.put("/api/projects/{project_id}/images/{image_id}", response_model=ImageAttachment)
-def update_image(
-    project_id: UUID, image_id: UUID, image: ImageAttachment, repo: LocalRepository = Depends(get_repository)
-) -> ImageAttachment:
-    aligned = image.model_copy(update={"id": image_id})
+def update_image(project_id: UUID, image_id: UUID, image: ImageAttachment) -> ImageAttachment:
+    image.id = image_id
     try:
-        updated = repo.update_image(project_id, image_id, aligned)
+        updated = repository.update_image(project_id, image_id, image)
         if updated.is_cover:
-            log_event(repo, project_id, "Назначена обложка проекта", updated.filename)
+            log_event(repository, project_id, "Назначена обложка проекта", updated.filename)
         else:
-            log_event(repo, project_id, "Обновлено изображение", updated.filename)
+            log_event(repository, project_id, "Обновлено изображение", updated.filename)
         return updated
     except KeyError:
         raise HTTPException(status_code=404, detail="Изображение не найдено или проект не существует")
 
 
 @app.delete("/api/projects/{project_id}/images/{image_id}", status_code=204)
-def delete_image(project_id: UUID, image_id: UUID, repo: LocalRepository = Depends(get_repository)) -> None:
+def delete_image(project_id: UUID, image_id: UUID) -> None:
     try:
-        image = next((item for item in repo.list_images(project_id) if item.id == image_id), None)
+        image = next((item for item in repository.list_images(project_id) if item.id == image_id), None)
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
@@ -1213,34 +1227,34 @@ def delete_image(project_id: UUID, image_id: UUID, repo: LocalRepository = Depen
     stored_path = resolve_storage_path(image.path)
     preview_path = resolve_storage_path(image.preview_path) if image.preview_path else None
     try:
-        repo.delete_image(project_id, image_id)
+        repository.delete_image(project_id, image_id)
         if stored_path.exists():
             stored_path.unlink()
         if preview_path and preview_path.exists():
             preview_path.unlink()
-        log_event(repo, project_id, "Удалено изображение", image.filename)
+        log_event(repository, project_id, "Удалено изображение", image.filename)
     except KeyError:
         raise HTTPException(status_code=404, detail="Изображение не найдено или проект не существует")
 
 
 @app.post("/api/projects/{project_id}/images/clear-cover", status_code=204)
-def clear_project_cover(project_id: UUID, repo: LocalRepository = Depends(get_repository)) -> Response:
+def clear_project_cover(project_id: UUID) -> Response:
     """Снять обложку проекта, оставив изображения без флага is_cover."""
 
     try:
-        repo.clear_cover(project_id)
-        log_event(repo, project_id, "Снята обложка проекта")
+        repository.clear_cover(project_id)
+        log_event(repository, project_id, "Снята обложка проекта")
         return Response(status_code=204)
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
 
 @app.get("/api/projects/{project_id}/images/archive")
-def download_images_archive(project_id: UUID, repo: LocalRepository = Depends(get_repository)) -> StreamingResponse:
+def download_images_archive(project_id: UUID) -> Response:
     """Скачать все изображения проекта единым архивом."""
 
     try:
-        images = repo.list_images(project_id)
+        images = repository.list_images(project_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
@@ -1252,16 +1266,15 @@ def download_images_archive(project_id: UUID, repo: LocalRepository = Depends(ge
                 continue
             zf.write(path, arcname=image.filename)
 
-    buffer.seek(0)
     headers = {"Content-Disposition": "attachment; filename=project-images.zip"}
-    log_event(repo, project_id, "Скачан архив изображений")
-    return StreamingResponse(buffer, media_type="application/zip", headers=headers)
+    log_event(repository, project_id, "Скачан архив изображений")
+    return Response(content=buffer.getvalue(), media_type="application/zip", headers=headers)
 
 
 @app.get("/api/projects/{project_id}/images/{image_id}/download")
-def download_image(project_id: UUID, image_id: UUID, repo: LocalRepository = Depends(get_repository)) -> FileResponse:
+def download_image(project_id: UUID, image_id: UUID) -> FileResponse:
     try:
-        image = next((item for item in repo.list_images(project_id) if item.id == image_id), None)
+        image = next((item for item in repository.list_images(project_id) if item.id == image_id), None)
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
@@ -1276,9 +1289,9 @@ def download_image(project_id: UUID, image_id: UUID, repo: LocalRepository = Dep
 
 
 @app.get("/api/projects/{project_id}/images/{image_id}/preview")
-def download_image_preview(project_id: UUID, image_id: UUID, repo: LocalRepository = Depends(get_repository)) -> FileResponse:
+def download_image_preview(project_id: UUID, image_id: UUID) -> FileResponse:
     try:
-        image = next((item for item in repo.list_images(project_id) if item.id == image_id), None)
+        image = next((item for item in repository.list_images(project_id) if item.id == image_id), None)
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
@@ -1293,39 +1306,37 @@ def download_image_preview(project_id: UUID, image_id: UUID, repo: LocalReposito
 
 
 @app.get("/api/projects/{project_id}/comments", response_model=list[Comment])
-def list_project_comments(project_id: UUID, repo: LocalRepository = Depends(get_repository)) -> list[Comment]:
+async def list_project_comments(project_id: UUID) -> list[Comment]:
     try:
-        return repo.list_project_comments(project_id)
+        return repository.list_project_comments(project_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
 
 @app.post("/api/projects/{project_id}/comments", response_model=Comment, status_code=201)
-def add_project_comment(project_id: UUID, comment: Comment, repo: LocalRepository = Depends(get_repository)) -> Comment:
+def add_project_comment(project_id: UUID, comment: Comment) -> Comment:
     try:
-        created = repo.add_project_comment(project_id, comment)
-        log_event(repo, project_id, "Добавлен комментарий к проекту")
+        created = repository.add_project_comment(project_id, comment)
+        log_event(repository, project_id, "Добавлен комментарий к проекту")
         return created
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
 
 @app.delete("/api/projects/{project_id}/comments/{comment_id}", status_code=204)
-def delete_project_comment(project_id: UUID, comment_id: UUID, repo: LocalRepository = Depends(get_repository)) -> None:
+def delete_project_comment(project_id: UUID, comment_id: UUID) -> None:
     try:
-        repo.delete_project_comment(project_id, comment_id)
-        log_event(repo, project_id, "Удалён комментарий к проекту")
+        repository.delete_project_comment(project_id, comment_id)
+        log_event(repository, project_id, "Удалён комментарий к проекту")
     except KeyError:
         raise HTTPException(status_code=404, detail="Комментарий не найден или проект не существует")
 
 
 @app.put("/api/projects/{project_id}/comments/{comment_id}", response_model=Comment)
-def update_project_comment(
-    project_id: UUID, comment_id: UUID, comment: Comment, repo: LocalRepository = Depends(get_repository)
-) -> Comment:
+def update_project_comment(project_id: UUID, comment_id: UUID, comment: Comment) -> Comment:
     try:
-        updated = repo.update_project_comment(project_id, comment_id, comment.text)
-        log_event(repo, project_id, "Изменён комментарий к проекту")
+        updated = repository.update_project_comment(project_id, comment_id, comment.text)
+        log_event(repository, project_id, "Изменён комментарий к проекту")
         return updated
     except KeyError:
         raise HTTPException(status_code=404, detail="Комментарий не найден или проект не существует")
@@ -1335,14 +1346,11 @@ def update_project_comment(
     "/api/projects/{project_id}/tasks/{task_id}/comments",
     response_model=list[Comment],
 )
-def list_task_comments(project_id: UUID, task_id: UUID, repo: LocalRepository = Depends(get_repository)) -> list[Comment]:
+async def list_task_comments(project_id: UUID, task_id: UUID) -> list[Comment]:
     try:
-        return repo.list_task_comments(project_id, task_id)
+        return repository.list_task_comments(project_id, task_id)
     except KeyError as exc:
-        message = str(exc)
-        if "Project" in message:
-            raise HTTPException(status_code=404, detail="Проект не найден")
-        raise HTTPException(status_code=404, detail="Задача не найдена")
+        raise not_found(exc)
 
 
 @app.post(
@@ -1350,109 +1358,90 @@ def list_task_comments(project_id: UUID, task_id: UUID, repo: LocalRepository =
     response_model=Comment,
     status_code=201,
 )
-def add_task_comment(project_id: UUID, task_id: UUID, comment: Comment, repo: LocalRepository = Depends(get_repository)) -> Comment:
+def add_task_comment(project_id: UUID, task_id: UUID, comment: Comment) -> Comment:
     try:
-        created = repo.add_task_comment(project_id, task_id, comment)
-        log_event(repo, project_id, "Комментарий к задаче", comment.text[:140])
+        created = repository.add_task_comment(project_id, task_id, comment)
+        log_event(repository, project_id, "Комментарий к задаче", comment.text[:140])
         return created
     except KeyError as exc:
-        message = str(exc)
-        if "Project" in message:
-            raise HTTPException(status_code=404, detail="Проект не найден")
-        raise HTTPException(status_code=404, detail="Задача не найдена")
+        raise not_found(exc)
 
 
 @app.delete(
     "/api/projects/{project_id}/tasks/{task_id}/comments/{comment_id}",
     status_code=204,
 )
-def delete_task_comment(
-    project_id: UUID, task_id: UUID, comment_id: UUID, repo: LocalRepository = Depends(get_repository)
-) -> None:
+def delete_task_comment(project_id: UUID, task_id: UUID, comment_id: UUID) -> None:
     try:
-        repo.delete_task_comment(project_id, task_id, comment_id)
-        log_event(repo, project_id, "Удалён комментарий задачи")
+        repository.delete_task_comment(project_id, task_id, comment_id)
+        log_event(repository, project_id, "Удалён комментарий задачи")
     except KeyError as exc:
-        message = str(exc)
-        if "Project" in message:
-            raise HTTPException(status_code=404, detail="Проект не найден")
-        if "Task" in message:
-            raise HTTPException(status_code=404, detail="Задача не найдена")
-        raise HTTPException(status_code=404, detail="Комментарий не найден")
+        raise not_found(exc)
 
 
 @app.put(
     "/api/projects/{project_id}/tasks/{task_id}/comments/{comment_id}",
     response_model=Comment,
 )
-def update_task_comment(
-    project_id: UUID, task_id: UUID, comment_id: UUID, comment: Comment, repo: LocalRepository = Depends(get_repository)
-) -> Comment:
+def update_task_comment(project_id: UUID, task_id: UUID, comment_id: UUID, comment: Comment) -> Comment:
     try:
-        updated = repo.update_task_comment(project_id, task_id, comment_id, comment.text)
-        log_event(repo, project_id, "Изменён комментарий задачи")
+        updated = repository.update_task_comment(project_id, task_id, comment_id, comment.text)
+        log_event(repository, project_id, "Изменён комментарий задачи")
         return updated
     except KeyError as exc:
-        message = str(exc)
-        if "Project" in message:
-            raise HTTPException(status_code=404, detail="Проект не найден")
-        if "Task" in message:
-            raise HTTPException(status_code=404, detail="Задача не найдена")
-        raise HTTPException(status_code=404, detail="Комментарий не найден")
+        raise not_found(exc)
 
 
 @app.get("/api/projects/{project_id}/history", response_model=list[HistoryEvent])
-def list_history(project_id: UUID, repo: LocalRepository = Depends(get_repository)) -> list[HistoryEvent]:
+async def list_history(project_id: UUID) -> list[HistoryEvent]:
     try:
-        return repo.list_history(project_id)
+        return repository.list_history(project_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
 
 @app.post("/api/projects/{project_id}/history", response_model=HistoryEvent, status_code=201)
-def add_history_event(
-    project_id: UUID, event: HistoryEvent, repo: LocalRepository = Depends(get_repository)
-) -> HistoryEvent:
+def add_history_event(project_id: UUID, event: HistoryEvent) -> HistoryEvent:
     try:
-        return repo.add_history_event(project_id, event)
+        return repository.add_history_event(project_id, event)
     except KeyError:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
 
 @app.delete("/api/projects/{project_id}/history/{event_id}", status_code=204)
-def delete_history_event(project_id: UUID, event_id: UUID, repo: LocalRepository = Depends(get_repository)) -> None:
+def delete_history_event(project_id: UUID, event_id: UUID) -> None:
     try:
-        repo.delete_history_event(project_id, event_id)
+        repository.delete_history_event(project_id, event_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Событие не найдено или проект не существует")
 
 
 @app.get("/api/backups", response_model=list[BackupInfo])
-def list_backups(repo: LocalRepository = Depends(get_repository)) -> list[BackupInfo]:
+def list_backups() -> list[BackupInfo]:
     """Вернуть список доступных резервных копий."""
 
-    return repo.list_backups(settings.backups_dir)
+    return repository.list_backups(settings.backups_dir)
 
 
 @app.post("/api/backups", response_model=BackupInfo, status_code=201)
-def create_backup(repo: LocalRepository = Depends(get_repository)) -> BackupInfo:
+def create_backup() -> BackupInfo:
     """Создать резервную копию текущего хранилища."""
 
-    return repo.create_backup(settings.backups_dir)
+    return repository.create_backup(settings.backups_dir)
 
 
 @app.post("/api/backups/restore", response_model=BackupInfo)
-def restore_backup(request: BackupRestoreRequest, repo: LocalRepository = Depends(get_repository)) -> BackupInfo:
+def restore_backup(request: BackupRestoreRequest) -> BackupInfo:
     """Восстановить хранилище из выбранной резервной копии."""
 
     try:
-        return repo.restore_from_backup(settings.backups_dir, request.file_name)
+        return repository.restore_from_backup(settings.backups_dir, request.file_name)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Резервная копия не найдена")
 
 
-if FRONTEND_DIR.exists():
-    app.mount("/", StaticFiles(directory=FRONTEND_DIR, html=True), name="frontend")
+if FRONTEND_EXISTS:
+    app.mount("/", StaticFiles(directory=FRONTEND_DIR, html=True, check_dir=False), name="frontend")
 else:
     @app.get("/", response_class=HTMLResponse)
     def frontend_placeholder() -> str:
@@ -9,10 +9,17 @@
 
 from __future__ import annotations
 
+import atexit
 from collections import Counter
+from contextlib import contextmanager
 from datetime import date, datetime, timezone, timedelta
+from functools import wraps
+from operator import attrgetter, itemgetter
+import logging
+import os
 from pathlib import Path
-from typing import Iterable
+import threading
+from typing import AbstractSet, Callable, Iterator, Iterable, TypeVar
 from uuid import UUID, uuid4
 
 from pydantic import BaseModel, ConfigDict, Field
@@ -68,8 +75,31 @@ class DataStore(BaseModel):
     model_config = ConfigDict(arbitrary_types_allowed=True, json_encoders={Path: str})
 
 
-def _write_json(path: Path, store: DataStore) -> None:
-    path.write_text(store.model_dump_json(indent=2, exclude_none=True, by_alias=False), encoding="utf-8")
+_BY_ORDER = attrgetter("order")
+_T = TypeVar("_T")
+logger = logging.getLogger("hpt.storage")
+
+
+def _dump_store(store: DataStore) -> str:
+    return store.model_dump_json(indent=2, exclude_none=True, by_alias=False)
+
+
+def _write_json(path: Path, content: str) -> None:
+    # Запись во временный файл с последующей заменой: при сбое основной файл остаётся целым
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_text(content, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _mutation(method: Callable[..., _T]) -> Callable[..., _T]:
+    """Выполнить метод репозитория под общим замком данных."""
+
+    @wraps(method)
+    def locked(self: LocalRepository, *args, **kwargs) -> _T:
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return locked
 
 
 def load_store(path: Path) -> DataStore:
@@ -156,7 +186,7 @@ def _build_custom_field_meta(items, field_accessor, *, counter_key: str) -> list
             freq = Counter(str(v) for v in values if v not in (None, ""))
             options = [
                 CustomFieldOption(value=val, count=cnt)
-                for val, cnt in sorted(freq.items(), key=lambda x: x[0])
+                for val, cnt in sorted(freq.items(), key=itemgetter(0))
             ]
         meta_kwargs = {
             "field_id": key,
@@ -227,17 +257,238 @@ def _filter_by_custom_fields(items, filters: list[CustomFieldFilterRequest] | No
     return filtered
 
 
+class NotFoundError(KeyError):
+    """Запрошенная сущность отсутствует в хранилище."""
+
+
+class ProjectNotFound(NotFoundError):
+    pass
+
+
+class SourceProjectNotFound(ProjectNotFound):
+    """Не найден проект, из которого копируют данные."""
+
+
+class GroupNotFound(NotFoundError):
+    pass
+
+
+class TaskNotFound(NotFoundError):
+    pass
+
+
+class SubtaskNotFound(NotFoundError):
+    pass
+
+
+class StageNotFound(NotFoundError):
+    pass
+
+
+class SectionNotFound(NotFoundError):
+    pass
+
+
+class FieldNotFound(NotFoundError):
+    pass
+
+
+class GTMTemplateNotFound(NotFoundError):
+    pass
+
+
+class CharacteristicTemplateNotFound(NotFoundError):
+    pass
+
+
+class AttachmentNotFound(NotFoundError):
+    pass
+
+
+class ImageNotFound(NotFoundError):
+    pass
+
+
+class CommentNotFound(NotFoundError):
+    pass
+
+
+class HistoryEventNotFound(NotFoundError):
+    pass
+
+
+class GroupHasProjects(ValueError):
+    """Группу нельзя удалить, пока к ней привязаны проекты."""
+
+
+def _position_of(items: list, positions: dict[UUID, int], item_id: UUID) -> int | None:
+    """Позиция объекта по индексу, сверенная с текущим списком; при расхождении — линейный поиск.
+
+    Индекс мог устареть, если список изменили, а save() ещё не вызван.
+    """
+
+    idx = positions.get(item_id)
+    if idx is not None and idx < len(items) and items[idx].id == item_id:
+        return idx
+    for idx, item in enumerate(items):
+        if item.id == item_id:
+            return idx
+    return None
+
+
+class _StoreIndex:
+    """Индексы хранилища для одной версии данных.
+
+    Позиции объектов по id заменяют линейный поиск в get_*; перед использованием
+    их сверяют с живым списком (см. `_position_of`). Списки по группе и статусу
+    сохраняют порядок проектов в хранилище.
+    Индекс задач по этапам строится лениво и только для тех проектов,
+    чьи задачи запрашивали.
+    """
+
+    def __init__(self, store: DataStore):
+        self.group_positions = {group.id: idx for idx, group in enumerate(store.product_groups)}
+        self.gtm_template_positions = {template.id: idx for idx, template in enumerate(store.gtm_templates)}
+        self.characteristic_template_positions = {
+            template.id: idx for idx, template in enumerate(store.characteristic_templates)
+        }
+        self.positions: dict[UUID, int] = {}
+        self.by_group: dict[UUID, list[Project]] = {}
+        self.by_status: dict[ProjectStatus, list[Project]] = {}
+        for position, project in enumerate(store.projects):
+            self.positions[project.id] = position
+            self.by_group.setdefault(project.group_id, []).append(project)
+            self.by_status.setdefault(project.status, []).append(project)
+        self._tasks_by_stage: dict[UUID, dict[UUID | None, list[Task]]] = {}
+
+    def candidates(self, group_id: UUID | None, statuses: AbstractSet[ProjectStatus] | None) -> list[Project] | None:
+        """Наименьший из списков, покрывающих фильтр по группе и статусам; None — индекс не помогает."""
+
+        options: list[list[Project]] = []
+        if group_id:
+            options.append(self.by_group.get(group_id, []))
+        if statuses:
+            if len(statuses) == 1:
+                options.append(self.by_status.get(next(iter(statuses)), []))
+            else:
+                merged = [p for status in statuses for p in self.by_status.get(status, ())]
+                merged.sort(key=lambda p: self.positions[p.id])
+                options.append(merged)
+        return min(options, key=len) if options else None
+
+    def tasks_by_stage(self, project: Project) -> dict[UUID | None, list[Task]]:
+        grouped = self._tasks_by_stage.get(project.id)
+        if grouped is None:
+            grouped = {}
+            for task in project.tasks:
+                grouped.setdefault(task.gtm_stage_id, []).append(task)
+            self._tasks_by_stage[project.id] = grouped
+        return grouped
+
+
 class LocalRepository:
-    """Простейший репозиторий поверх JSON-файла."""
+    """Простейший репозиторий поверх JSON-файла.
+
+    Файл пишет фоновый поток: `save()` только отмечает изменение и будит его,
+    а несколько сохранений подряд сливаются в одну запись последнего состояния.
+    Изменяющие методы выполняются под общим замком `_lock`; под ним же растёт
+    версия и снимается JSON-снимок для записи, поэтому на диск не попадает
+    наполовину изменённое состояние. Изменения, сделанные за миллисекунды до
+    аварийного завершения процесса, могут не попасть на диск; при обычном выходе
+    `flush()` вызывается через atexit, а `close()` останавливает поток явно.
+    """
 
     def __init__(self, path: Path):
         self.path = path
         self.store = load_store(path)
+        # Номер версии данных растёт при каждом сохранении; вместе с меткой экземпляра
+        # он служит ETag для GET-запросов, чтобы после перезапуска старые ETag не совпадали
+        self.version = 0
+        self._instance_tag = uuid4().hex[:8]
+        self._lock = threading.RLock()
+        self._persisted_version = 0
+        self._write_lock = threading.Lock()
+        self._write_requested = threading.Event()
+        self._closed = threading.Event()
+        self._index: tuple[int, _StoreIndex] | None = None
+        self._writer = threading.Thread(target=self._writer_loop, name="hpt-store-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
         self._ensure_project_short_ids()
 
+    def __enter__(self) -> LocalRepository:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def version_tag(self) -> str:
+        return f"{self._instance_tag}-{self.version}"
+
     def save(self) -> None:
-        _write_json(self.path, self.store)
+        with self._lock:
+            self.version += 1
+        self._write_requested.set()
+
+    def _snapshot(self) -> tuple[int, str]:
+        with self._lock:
+            return self.version, _dump_store(self.store)
+
+    def flush(self) -> None:
+        """Синхронно записать на диск все изменения, ещё не сохранённые фоновым потоком."""
+
+        with self._write_lock:
+            if self.version == self._persisted_version:
+                return
+            version, content = self._snapshot()
+            _write_json(self.path, content)
+            self._persisted_version = version
+
+    def close(self) -> None:
+        """Остановить фоновую запись и сохранить последние изменения."""
+
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._write_requested.set()
+        self._writer.join()
+        self.flush()
+        atexit.unregister(self.flush)
+
+    def _writer_loop(self) -> None:
+        while True:
+            self._write_requested.wait()
+            self._write_requested.clear()
+            if self._closed.is_set():
+                return
+            try:
+                self.flush()
+            except Exception:  # noqa: BLE001
+                logger.exception("Не удалось записать хранилище %s", self.path)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Выполнить несколько изменений как одно: другие потоки и фоновая запись ждут конца блока.
+
+        Снимок для записи берётся под тем же замком, поэтому все сохранения
+        внутри блока попадают на диск одной записью.
+        """
 
+        with self._lock:
+            yield
+
+    def _store_index(self) -> _StoreIndex:
+        """Индексы для текущей версии; любое сохранение делает их устаревшими."""
+
+        version = self.version
+        cached = self._index
+        if cached is None or cached[0] != version:
+            cached = (version, _StoreIndex(self.store))
+            self._index = cached
+        return cached[1]
+
+    @_mutation
     def _ensure_project_short_ids(self) -> None:
         """Назначить короткие ID проектам, у которых они отсутствуют."""
 
@@ -261,7 +512,7 @@ class LocalRepository:
         include_archived: bool = True,
         *,
         brand: str | None = None,
-        statuses: set[GroupStatus] | None = None,
+        statuses: AbstractSet[GroupStatus] | None = None,
         extra_key: str | None = None,
         extra_value: str | None = None,
         filters: list[CustomFieldFilterRequest] | None = None,
@@ -288,34 +539,40 @@ class LocalRepository:
         return list(groups)
 
     def get_group(self, group_id: UUID) -> ProductGroup | None:
-        for group in self.store.product_groups:
-            if group.id == group_id:
-                return group
-        return None
+        groups = self.store.product_groups
+        idx = _position_of(groups, self._store_index().group_positions, group_id)
+        return None if idx is None else groups[idx]
 
+    @_mutation
     def add_group(self, group: ProductGroup) -> ProductGroup:
         self.store.product_groups.append(group)
         self.save()
         return group
 
+    @_mutation
     def update_group(self, group_id, updated: ProductGroup) -> ProductGroup:
         for idx, group in enumerate(self.store.product_groups):
             if group.id == group_id:
                 self.store.product_groups[idx] = updated
                 self.save()
                 return updated
-        raise KeyError(f"Group {group_id} not found")
+        raise GroupNotFound(f"Group {group_id} not found")
 
+    @_mutation
     def delete_group(self, group_id: UUID) -> None:
+        """Удалить группу; группу со связанными проектами удалить нельзя."""
+
+        if self.has_projects_for_group(group_id):
+            raise GroupHasProjects(f"Group {group_id} has projects")
         for idx, group in enumerate(self.store.product_groups):
             if group.id == group_id:
                 self.store.product_groups.pop(idx)
                 self.save()
                 return
-        raise KeyError(f"Group {group_id} not found")
+        raise GroupNotFound(f"Group {group_id} not found")
 
     def has_projects_for_group(self, group_id: UUID) -> bool:
-        return any(project.group_id == group_id for project in self.store.projects)
+        return bool(self._store_index().by_group.get(group_id))
 
     # --- Projects ---
     def list_projects(
@@ -323,36 +580,26 @@ class LocalRepository:
         *,
         include_archived: bool = True,
         group_id: UUID | None = None,
-        statuses: set[ProjectStatus] | None = None,
+        statuses: AbstractSet[ProjectStatus] | None = None,
         brand: str | None = None,
         current_stage_id: UUID | None = None,
         planned_from: date | None = None,
         planned_to: date | None = None,
         filters: list[CustomFieldFilterRequest] | None = None,
     ) -> list[Project]:
-        projects: Iterable[Project] = self.store.projects
-        if not include_archived:
-            projects = [p for p in projects if p.status != ProjectStatus.ARCHIVED]
-        if group_id:
-            projects = [p for p in projects if p.group_id == group_id]
-        if statuses:
-            projects = [p for p in projects if p.status in statuses]
-        if brand:
-            projects = [p for p in projects if p.brand.lower() == brand.lower()]
-        if current_stage_id:
-            projects = [p for p in projects if p.current_gtm_stage_id == current_stage_id]
-        if planned_from:
-            projects = [
-                p
-                for p in projects
-                if p.planned_launch is not None and p.planned_launch >= planned_from
-            ]
-        if planned_to:
-            projects = [
-                p
-                for p in projects
-                if p.planned_launch is not None and p.planned_launch <= planned_to
-            ]
+        brand_lc = brand.lower() if brand else None
+        candidates = self._store_index().candidates(group_id, statuses)
+        projects: Iterable[Project] = [
+            p
+            for p in (self.store.projects if candidates is None else candidates)
+            if (include_archived or p.status != ProjectStatus.ARCHIVED)
+            and (not group_id or p.group_id == group_id)
+            and (not statuses or p.status in statuses)
+            and (brand_lc is None or p.brand.lower() == brand_lc)
+            and (not current_stage_id or p.current_gtm_stage_id == current_stage_id)
+            and (not planned_from or (p.planned_launch is not None and p.planned_launch >= planned_from))
+            and (not planned_to or (p.planned_launch is not None and p.planned_launch <= planned_to))
+        ]
         projects = _filter_by_custom_fields(projects, filters, field_accessor=lambda p: p.custom_fields)
         return list(projects)
 
@@ -367,11 +614,12 @@ class LocalRepository:
         )
 
     def get_project(self, project_id: UUID) -> Project | None:
-        for project in self.store.projects:
-            if project.id == project_id:
-                return project
-        return None
+        try:
+            return self._get_project_with_index(project_id)[1]
+        except ProjectNotFound:
+            return None
 
+    @_mutation
     def add_project(self, project: Project) -> Project:
         if project.short_id is None:
             project.short_id = self.store.next_project_short_id
@@ -380,24 +628,29 @@ class LocalRepository:
         self.save()
         return project
 
-    def update_project(self, project_id, updated: Project) -> Project:
-        for idx, project in enumerate(self.store.projects):
-            if project.id == project_id:
-                if updated.short_id is None:
-                    updated = updated.model_copy(update={"short_id": project.short_id})
-                self.store.projects[idx] = updated
-                self.save()
-                return updated
-        raise KeyError(f"Project {project_id} not found")
+    @_mutation
+    def update_project_checked(self, project_id: UUID, updated: Project) -> tuple[Project, Project]:
+        """Заменить проект, проверив его наличие и группу; вернуть прежнюю и новую версии."""
 
+        idx, previous = self._get_project_with_index(project_id)
+        if self.get_group(updated.group_id) is None:
+            raise GroupNotFound(f"Group {updated.group_id} not found")
+        if updated.short_id is None:
+            updated = updated.model_copy(update={"short_id": previous.short_id})
+        self.store.projects[idx] = updated
+        self.save()
+        return previous, updated
+
+    @_mutation
     def delete_project(self, project_id: UUID) -> None:
         for idx, project in enumerate(self.store.projects):
             if project.id == project_id:
                 self.store.projects.pop(idx)
                 self.save()
                 return
-        raise KeyError(f"Project {project_id} not found")
+        raise ProjectNotFound(f"Project {project_id} not found")
 
+    @_mutation
     def import_projects(self, projects: list[Project]) -> list[Project]:
         """Импортировать или обновить список проектов из Excel."""
 
@@ -419,6 +672,7 @@ class LocalRepository:
         self.save()
         return updated_projects
 
+    @_mutation
     def replace_project(self, project_id: UUID, updated: Project) -> Project:
         for idx, project in enumerate(self.store.projects):
             if project.id == project_id:
@@ -427,13 +681,14 @@ class LocalRepository:
                 self.store.projects[idx] = updated.model_copy(update={"id": project_id})
                 self.save()
                 return updated
-        raise KeyError(f"Project {project_id} not found")
+        raise ProjectNotFound(f"Project {project_id} not found")
 
     def _get_project_with_index(self, project_id: UUID) -> tuple[int, Project]:
-        for idx, project in enumerate(self.store.projects):
-            if project.id == project_id:
-                return idx, project
-        raise KeyError(f"Project {project_id} not found")
+        projects = self.store.projects
+        idx = _position_of(projects, self._store_index().positions, project_id)
+        if idx is None:
+            raise ProjectNotFound(f"Project {project_id} not found")
+        return idx, projects[idx]
 
     def _get_characteristic_section_with_index(
         self, project: Project, section_id: UUID
@@ -441,60 +696,63 @@ class LocalRepository:
         for idx, section in enumerate(project.characteristics):
             if section.id == section_id:
                 return idx, section
-        raise KeyError(f"Characteristic section {section_id} not found")
+        raise SectionNotFound(f"Characteristic section {section_id} not found")
 
     def _get_task_with_index(self, project: Project, task_id: UUID) -> tuple[int, Task]:
         for idx, task in enumerate(project.tasks):
             if task.id == task_id:
                 return idx, task
-        raise KeyError(f"Task {task_id} not found")
+        raise TaskNotFound(f"Task {task_id} not found")
 
     # --- GTM templates ---
     def list_gtm_templates(self) -> list[GTMTemplate]:
         return list(self.store.gtm_templates)
 
     def get_gtm_template(self, template_id: UUID) -> GTMTemplate | None:
-        for template in self.store.gtm_templates:
-            if template.id == template_id:
-                return template
-        return None
+        templates = self.store.gtm_templates
+        idx = _position_of(templates, self._store_index().gtm_template_positions, template_id)
+        return None if idx is None else templates[idx]
 
+    @_mutation
     def add_gtm_template(self, template: GTMTemplate) -> GTMTemplate:
         self.store.gtm_templates.append(template)
         self.save()
         return template
 
+    @_mutation
     def update_gtm_template(self, template_id: UUID, updated: GTMTemplate) -> GTMTemplate:
         for idx, template in enumerate(self.store.gtm_templates):
             if template.id == template_id:
                 self.store.gtm_templates[idx] = updated
                 self.save()
                 return updated
-        raise KeyError(f"GTM template {template_id} not found")
+        raise GTMTemplateNotFound(f"GTM template {template_id} not found")
 
+    @_mutation
     def delete_gtm_template(self, template_id: UUID) -> None:
         for idx, template in enumerate(self.store.gtm_templates):
             if template.id == template_id:
                 self.store.gtm_templates.pop(idx)
                 self.save()
                 return
-        raise KeyError(f"GTM template {template_id} not found")
+        raise GTMTemplateNotFound(f"GTM template {template_id} not found")
 
     # --- Characteristic templates ---
     def list_characteristic_templates(self) -> list[CharacteristicTemplate]:
         return list(self.store.characteristic_templates)
 
     def get_characteristic_template(self, template_id: UUID) -> CharacteristicTemplate | None:
-        for template in self.store.characteristic_templates:
-            if template.id == template_id:
-                return template
-        return None
+        templates = self.store.characteristic_templates
+        idx = _position_of(templates, self._store_index().characteristic_template_positions, template_id)
+        return None if idx is None else templates[idx]
 
+    @_mutation
     def add_characteristic_template(self, template: CharacteristicTemplate) -> CharacteristicTemplate:
         self.store.characteristic_templates.append(template)
         self.save()
         return template
 
+    @_mutation
     def update_characteristic_template(
         self, template_id: UUID, updated: CharacteristicTemplate
     ) -> CharacteristicTemplate:
@@ -503,23 +761,25 @@ class LocalRepository:
                 self.store.characteristic_templates[idx] = updated
                 self.save()
                 return updated
-        raise KeyError(f"Characteristic template {template_id} not found")
+        raise CharacteristicTemplateNotFound(f"Characteristic template {template_id} not found")
 
+    @_mutation
     def delete_characteristic_template(self, template_id: UUID) -> None:
         for idx, template in enumerate(self.store.characteristic_templates):
             if template.id == template_id:
                 self.store.characteristic_templates.pop(idx)
                 self.save()
                 return
-        raise KeyError(f"Characteristic template {template_id} not found")
+        raise CharacteristicTemplateNotFound(f"Characteristic template {template_id} not found")
 
     # --- GTM stages inside projects ---
     def list_gtm_stages(self, project_id: UUID) -> list[GTMStage]:
         project = self.get_project(project_id)
         if not project:
-            raise KeyError(f"Project {project_id} not found")
+            raise ProjectNotFound(f"Project {project_id} not found")
         return list(project.gtm_stages)
 
+    @_mutation
     def add_gtm_stage(self, project_id: UUID, stage: GTMStage) -> GTMStage:
         for idx, project in enumerate(self.store.projects):
             if project.id == project_id:
@@ -529,21 +789,27 @@ class LocalRepository:
                 self.store.projects[idx] = project
                 self.save()
                 return stage
-        raise KeyError(f"Project {project_id} not found")
+        raise ProjectNotFound(f"Project {project_id} not found")
 
-    def update_gtm_stage(self, project_id: UUID, stage_id: UUID, updated: GTMStage) -> GTMStage:
-        for p_idx, project in enumerate(self.store.projects):
-            if project.id != project_id:
-                continue
-            for s_idx, stage in enumerate(project.gtm_stages):
-                if stage.id == stage_id:
-                    project.gtm_stages[s_idx] = updated
-                    self.store.projects[p_idx] = project
-                    self.save()
-                    return updated
-            raise KeyError(f"Stage {stage_id} not found in project {project_id}")
-        raise KeyError(f"Project {project_id} not found")
+    @_mutation
+    def update_gtm_stage_checked(
+        self, project_id: UUID, stage_id: UUID, updated: GTMStage
+    ) -> tuple[GTMStage, GTMStage]:
+        """Заменить этап GTM проекта; вернуть прежнюю и новую версии."""
 
+        p_idx, project = self._get_project_with_index(project_id)
+        for s_idx, stage in enumerate(project.gtm_stages):
+            if stage.id == stage_id:
+                break
+        else:
+            raise StageNotFound(f"Stage {stage_id} not found in project {project_id}")
+        updated.id = stage_id
+        project.gtm_stages[s_idx] = updated
+        self.store.projects[p_idx] = project
+        self.save()
+        return stage, updated
+
+    @_mutation
     def delete_gtm_stage(self, project_id: UUID, stage_id: UUID) -> None:
         for p_idx, project in enumerate(self.store.projects):
             if project.id != project_id:
@@ -554,13 +820,14 @@ class LocalRepository:
                     self.store.projects[p_idx] = project
                     self.save()
                     return
-            raise KeyError(f"Stage {stage_id} not found in project {project_id}")
-        raise KeyError(f"Project {project_id} not found")
+            raise StageNotFound(f"Stage {stage_id} not found in project {project_id}")
+        raise ProjectNotFound(f"Project {project_id} not found")
 
+    @_mutation
     def apply_gtm_template(self, project_id: UUID, template_id: UUID) -> list[GTMStage]:
         template = self.get_gtm_template(template_id)
         if template is None:
-            raise KeyError(f"GTM template {template_id} not found")
+            raise GTMTemplateNotFound(f"GTM template {template_id} not found")
 
         for p_idx, project in enumerate(self.store.projects):
             if project.id == project_id:
@@ -571,7 +838,7 @@ class LocalRepository:
                     stage_id_map[stage.id] = cloned_id
                     cloned_checklist = [
                         item.model_copy(update={"id": uuid4(), "done": False})
-                        for item in sorted(stage.checklist, key=lambda c: c.order)
+                        for item in sorted(stage.checklist, key=_BY_ORDER)
                     ]
                     return stage.model_copy(
                         update={
@@ -585,15 +852,15 @@ class LocalRepository:
                         }
                     )
 
-                new_stages = [clone_stage(stage) for stage in sorted(template.stages, key=lambda s: s.order)]
+                new_stages = [clone_stage(stage) for stage in sorted(template.stages, key=_BY_ORDER)]
 
                 def clone_task(task: Task) -> Task:
                     if task.gtm_stage_id not in stage_id_map:
-                        raise KeyError(f"Stage {task.gtm_stage_id} from template not found in cloned stages")
+                        raise StageNotFound(f"Stage {task.gtm_stage_id} from template not found in cloned stages")
 
                     cloned_subtasks = [
                         sub.model_copy(update={"id": uuid4(), "done": False})
-                        for sub in sorted(task.subtasks, key=lambda s: s.order)
+                        for sub in sorted(task.subtasks, key=_BY_ORDER)
                     ]
                     return task.model_copy(
                         update={
@@ -613,8 +880,9 @@ class LocalRepository:
                 self.store.projects[p_idx] = project
                 self.save()
                 return new_stages
-        raise KeyError(f"Project {project_id} not found")
+        raise ProjectNotFound(f"Project {project_id} not found")
 
+    @_mutation
     def replace_gtm_stages(
         self, project_id: UUID, stages: list[GTMStage], tasks: list[Task] | None = None
     ) -> list[GTMStage]:
@@ -627,8 +895,9 @@ class LocalRepository:
             self.store.projects[p_idx] = project
             self.save()
             return stages
-        raise KeyError(f"Project {project_id} not found")
+        raise ProjectNotFound(f"Project {project_id} not found")
 
+    @_mutation
     def create_gtm_template_from_project(self, project_id: UUID, name: str, description: str | None = None) -> GTMTemplate:
         for project in self.store.projects:
             if project.id != project_id:
@@ -640,7 +909,7 @@ class LocalRepository:
                 cloned_id = uuid4()
                 stage_id_map[stage.id] = cloned_id
                 cloned_checklist = [
-                    item.model_copy(update={"id": uuid4(), "done": False}) for item in sorted(stage.checklist, key=lambda c: c.order)
+                    item.model_copy(update={"id": uuid4(), "done": False}) for item in sorted(stage.checklist, key=_BY_ORDER)
                 ]
                 return stage.model_copy(
                     update={
@@ -654,14 +923,14 @@ class LocalRepository:
                     }
                 )
 
-            cloned_stages = [clone_stage(stage) for stage in sorted(project.gtm_stages, key=lambda s: s.order)]
+            cloned_stages = [clone_stage(stage) for stage in sorted(project.gtm_stages, key=_BY_ORDER)]
 
             def clone_task(task: Task) -> Task:
                 if task.gtm_stage_id not in stage_id_map:
                     return None  # skip tasks без этапа
                 cloned_subtasks = [
                     sub.model_copy(update={"id": uuid4(), "done": False})
-                    for sub in sorted(task.subtasks, key=lambda s: s.order)
+                    for sub in sorted(task.subtasks, key=_BY_ORDER)
                 ]
                 return task.model_copy(
                     update={
@@ -680,27 +949,28 @@ class LocalRepository:
             self.save()
             return template
 
-        raise KeyError(f"Project {project_id} not found")
+        raise ProjectNotFound(f"Project {project_id} not found")
 
     # --- Tasks ---
     def list_tasks(
         self,
         project_id: UUID,
         *,
-        statuses: set[TaskStatus] | None = None,
+        statuses: AbstractSet[TaskStatus] | None = None,
         only_active: bool = False,
         gtm_stage_id: UUID | None = None,
     ) -> list[Task]:
         _, project = self._get_project_with_index(project_id)
         tasks: Iterable[Task] = project.tasks
+        if gtm_stage_id:
+            tasks = self._store_index().tasks_by_stage(project).get(gtm_stage_id, [])
         if statuses:
             tasks = [t for t in tasks if t.status in statuses]
         if only_active:
             tasks = [t for t in tasks if t.status != TaskStatus.DONE]
-        if gtm_stage_id:
-            tasks = [t for t in tasks if t.gtm_stage_id == gtm_stage_id]
         return list(tasks)
 
+    @_mutation
     def add_task(self, project_id: UUID, task: Task) -> Task:
         p_idx, project = self._get_project_with_index(project_id)
         if task.gtm_stage_id is None:
@@ -712,20 +982,29 @@ class LocalRepository:
         self.save()
         return task
 
-    def update_task(self, project_id: UUID, task_id: UUID, updated: Task) -> Task:
+    @_mutation
+    def replace_task_fields(self, project_id: UUID, task_id: UUID, updated: Task) -> tuple[Task, Task]:
+        """Обновить поля задачи, сохранив её подзадачи и комментарии; вернуть прежнюю и новую версии."""
+
         p_idx, project = self._get_project_with_index(project_id)
+        for t_idx, task in enumerate(project.tasks):
+            if task.id == task_id:
+                break
+        else:
+            raise TaskNotFound(f"Task {task_id} not found in project {project_id}")
         if updated.gtm_stage_id is None:
             raise ValueError("gtm_stage_required")
         if not any(stage.id == updated.gtm_stage_id for stage in project.gtm_stages):
             raise ValueError("gtm_stage_missing")
-        for t_idx, task in enumerate(project.tasks):
-            if task.id == task_id:
-                project.tasks[t_idx] = updated
-                self.store.projects[p_idx] = project
-                self.save()
-                return updated
-        raise KeyError(f"Task {task_id} not found in project {project_id}")
+        updated.id = task_id
+        updated.subtasks = task.subtasks
+        updated.comments = task.comments
+        project.tasks[t_idx] = updated
+        self.store.projects[p_idx] = project
+        self.save()
+        return task, updated
 
+    @_mutation
     def delete_task(self, project_id: UUID, task_id: UUID) -> None:
         p_idx, project = self._get_project_with_index(project_id)
         for t_idx, task in enumerate(project.tasks):
@@ -734,9 +1013,10 @@ class LocalRepository:
                 self.store.projects[p_idx] = project
                 self.save()
                 return
-        raise KeyError(f"Task {task_id} not found in project {project_id}")
+        raise TaskNotFound(f"Task {task_id} not found in project {project_id}")
 
     # --- Subtasks ---
+    @_mutation
     def add_subtask(self, project_id: UUID, task_id: UUID, subtask: Subtask) -> Subtask:
         p_idx, project = self._get_project_with_index(project_id)
         for t_idx, task in enumerate(project.tasks):
@@ -748,23 +1028,29 @@ class LocalRepository:
                 self.store.projects[p_idx] = project
                 self.save()
                 return subtask
-        raise KeyError(f"Task {task_id} not found in project {project_id}")
+        raise TaskNotFound(f"Task {task_id} not found in project {project_id}")
+
+    @_mutation
+    def update_subtask_checked(
+        self, project_id: UUID, task_id: UUID, subtask_id: UUID, updated: Subtask
+    ) -> tuple[Subtask, Subtask]:
+        """Заменить подзадачу, найдя проект и задачу за один вызов; вернуть прежнюю и новую версии."""
 
-    def update_subtask(self, project_id: UUID, task_id: UUID, subtask_id: UUID, updated: Subtask) -> Subtask:
         p_idx, project = self._get_project_with_index(project_id)
-        for t_idx, task in enumerate(project.tasks):
-            if task.id != task_id:
-                continue
-            for s_idx, subtask in enumerate(task.subtasks):
-                if subtask.id == subtask_id:
-                    task.subtasks[s_idx] = updated
-                    project.tasks[t_idx] = task
-                    self.store.projects[p_idx] = project
-                    self.save()
-                    return updated
-            raise KeyError(f"Subtask {subtask_id} not found in task {task_id}")
-        raise KeyError(f"Task {task_id} not found in project {project_id}")
+        t_idx, task = self._get_task_with_index(project, task_id)
+        for s_idx, subtask in enumerate(task.subtasks):
+            if subtask.id == subtask_id:
+                break
+        else:
+            raise SubtaskNotFound(f"Subtask {subtask_id} not found in task {task_id}")
+        updated.id = subtask_id
+        task.subtasks[s_idx] = updated
+        project.tasks[t_idx] = task
+        self.store.projects[p_idx] = project
+        self.save()
+        return subtask, updated
 
+    @_mutation
     def delete_subtask(self, project_id: UUID, task_id: UUID, subtask_id: UUID) -> None:
         p_idx, project = self._get_project_with_index(project_id)
         for t_idx, task in enumerate(project.tasks):
@@ -777,14 +1063,15 @@ class LocalRepository:
                     self.store.projects[p_idx] = project
                     self.save()
                     return
-            raise KeyError(f"Subtask {subtask_id} not found in task {task_id}")
-        raise KeyError(f"Task {task_id} not found in project {project_id}")
+            raise SubtaskNotFound(f"Subtask {subtask_id} not found in task {task_id}")
+        raise TaskNotFound(f"Task {task_id} not found in project {project_id}")
 
     # --- Characteristics inside projects ---
     def list_characteristic_sections(self, project_id: UUID) -> list[CharacteristicSection]:
         _, project = self._get_project_with_index(project_id)
         return list(project.characteristics)
 
+    @_mutation
     def add_characteristic_section(self, project_id: UUID, section: CharacteristicSection) -> CharacteristicSection:
         p_idx, project = self._get_project_with_index(project_id)
         if section.order == 0 and project.characteristics:
@@ -794,6 +1081,7 @@ class LocalRepository:
         self.save()
         return section
 
+    @_mutation
     def update_characteristic_section(
         self, project_id: UUID, section_id: UUID, updated: CharacteristicSection
     ) -> CharacteristicSection:
@@ -804,6 +1092,7 @@ class LocalRepository:
         self.save()
         return updated
 
+    @_mutation
     def delete_characteristic_section(self, project_id: UUID, section_id: UUID) -> None:
         p_idx, project = self._get_project_with_index(project_id)
         s_idx, _ = self._get_characteristic_section_with_index(project, section_id)
@@ -811,6 +1100,7 @@ class LocalRepository:
         self.store.projects[p_idx] = project
         self.save()
 
+    @_mutation
     def add_characteristic_field(
         self, project_id: UUID, section_id: UUID, field: CharacteristicField
     ) -> CharacteristicField:
@@ -824,6 +1114,7 @@ class LocalRepository:
         self.save()
         return field
 
+    @_mutation
     def update_characteristic_field(
         self, project_id: UUID, section_id: UUID, field_id: UUID, updated: CharacteristicField
     ) -> CharacteristicField:
@@ -836,8 +1127,9 @@ class LocalRepository:
                 self.store.projects[p_idx] = project
                 self.save()
                 return updated
-        raise KeyError(f"Field {field_id} not found in section {section_id}")
+        raise FieldNotFound(f"Field {field_id} not found in section {section_id}")
 
+    @_mutation
     def delete_characteristic_field(self, project_id: UUID, section_id: UUID, field_id: UUID) -> None:
         p_idx, project = self._get_project_with_index(project_id)
         s_idx, section = self._get_characteristic_section_with_index(project, section_id)
@@ -848,14 +1140,15 @@ class LocalRepository:
                 self.store.projects[p_idx] = project
                 self.save()
                 return
-        raise KeyError(f"Field {field_id} not found in section {section_id}")
+        raise FieldNotFound(f"Field {field_id} not found in section {section_id}")
 
+    @_mutation
     def apply_characteristic_template(
         self, project_id: UUID, template_id: UUID
     ) -> list[CharacteristicSection]:
         template = self.get_characteristic_template(template_id)
         if template is None:
-            raise KeyError(f"Characteristic template {template_id} not found")
+            raise CharacteristicTemplateNotFound(f"Characteristic template {template_id} not found")
 
         p_idx, project = self._get_project_with_index(project_id)
         new_sections: list[CharacteristicSection] = []
@@ -870,10 +1163,13 @@ class LocalRepository:
         self.save()
         return new_sections
 
+    @_mutation
     def copy_characteristics_structure(
         self, project_id: UUID, source_project_id: UUID
     ) -> list[CharacteristicSection]:
-        _, source_project = self._get_project_with_index(source_project_id)
+        source_project = self.get_project(source_project_id)
+        if source_project is None:
+            raise SourceProjectNotFound(f"Source project {source_project_id} not found")
         p_idx, target_project = self._get_project_with_index(project_id)
 
         new_sections: list[CharacteristicSection] = []
@@ -889,6 +1185,7 @@ class LocalRepository:
         self.save()
         return new_sections
 
+    @_mutation
     def import_characteristics_from_excel(
         self, project_id: UUID, content: bytes
     ) -> tuple[list[CharacteristicSection], list[str], dict[str, int]]:
@@ -944,6 +1241,7 @@ class LocalRepository:
 
         return records
 
+    @_mutation
     def apply_characteristics_bulk(self, updates: dict[UUID, list[CharacteristicSection]]) -> None:
         if not updates:
             return
@@ -959,6 +1257,7 @@ class LocalRepository:
         _, project = self._get_project_with_index(project_id)
         return list(project.files)
 
+    @_mutation
     def add_file(self, project_id: UUID, file: FileAttachment) -> FileAttachment:
         p_idx, project = self._get_project_with_index(project_id)
         project.files.append(file)
@@ -966,6 +1265,7 @@ class LocalRepository:
         self.save()
         return file
 
+    @_mutation
     def update_file(self, project_id: UUID, file_id: UUID, updated: FileAttachment) -> FileAttachment:
         p_idx, project = self._get_project_with_index(project_id)
         for f_idx, file in enumerate(project.files):
@@ -974,8 +1274,9 @@ class LocalRepository:
                 self.store.projects[p_idx] = project
                 self.save()
                 return updated
-        raise KeyError(f"File {file_id} not found in project {project_id}")
+        raise AttachmentNotFound(f"File {file_id} not found in project {project_id}")
 
+    @_mutation
     def delete_file(self, project_id: UUID, file_id: UUID) -> None:
         p_idx, project = self._get_project_with_index(project_id)
         for f_idx, file in enumerate(project.files):
@@ -984,7 +1285,7 @@ class LocalRepository:
                 self.store.projects[p_idx] = project
                 self.save()
                 return
-        raise KeyError(f"File {file_id} not found in project {project_id}")
+        raise AttachmentNotFound(f"File {file_id} not found in project {project_id}")
 
     # --- Images ---
     def list_images(self, project_id: UUID) -> list[ImageAttachment]:
@@ -998,6 +1299,7 @@ class LocalRepository:
             if img.id != cover_image_id and img.is_cover:
                 img.is_cover = False
 
+    @_mutation
     def clear_cover(self, project_id: UUID) -> None:
         p_idx, project = self._get_project_with_index(project_id)
         changed = False
@@ -1012,6 +1314,7 @@ class LocalRepository:
             # Сохраняем порядок даже если обложка не была задана
             self.store.projects[p_idx] = project
 
+    @_mutation
     def add_image(self, project_id: UUID, image: ImageAttachment) -> ImageAttachment:
         p_idx, project = self._get_project_with_index(project_id)
         if image.order == 0 and project.images:
@@ -1022,6 +1325,7 @@ class LocalRepository:
         self.save()
         return image
 
+    @_mutation
     def update_image(
         self, project_id: UUID, image_id: UUID, updated: ImageAttachment
     ) -> ImageAttachment:
@@ -1034,8 +1338,9 @@ class LocalRepository:
                 self.store.projects[p_idx] = project
                 self.save()
                 return updated
-        raise KeyError(f"Image {image_id} not found in project {project_id}")
+        raise ImageNotFound(f"Image {image_id} not found in project {project_id}")
 
+    @_mutation
     def delete_image(self, project_id: UUID, image_id: UUID) -> None:
         p_idx, project = self._get_project_with_index(project_id)
         for img_idx, image in enumerate(project.images):
@@ -1044,13 +1349,14 @@ class LocalRepository:
                 self.store.projects[p_idx] = project
                 self.save()
                 return
-        raise KeyError(f"Image {image_id} not found in project {project_id}")
+        raise ImageNotFound(f"Image {image_id} not found in project {project_id}")
 
     # --- Project comments ---
     def list_project_comments(self, project_id: UUID) -> list[Comment]:
         _, project = self._get_project_with_index(project_id)
         return list(project.comments)
 
+    @_mutation
     def add_project_comment(self, project_id: UUID, comment: Comment) -> Comment:
         p_idx, project = self._get_project_with_index(project_id)
         project.comments.insert(0, comment)
@@ -1058,6 +1364,7 @@ class LocalRepository:
         self.save()
         return comment
 
+    @_mutation
     def delete_project_comment(self, project_id: UUID, comment_id: UUID) -> None:
         p_idx, project = self._get_project_with_index(project_id)
         for c_idx, comment in enumerate(project.comments):
@@ -1066,8 +1373,9 @@ class LocalRepository:
                 self.store.projects[p_idx] = project
                 self.save()
                 return
-        raise KeyError(f"Comment {comment_id} not found in project {project_id}")
+        raise CommentNotFound(f"Comment {comment_id} not found in project {project_id}")
 
+    @_mutation
     def update_project_comment(self, project_id: UUID, comment_id: UUID, text: str) -> Comment:
         p_idx, project = self._get_project_with_index(project_id)
         for comment in project.comments:
@@ -1077,7 +1385,7 @@ class LocalRepository:
                 self.store.projects[p_idx] = project
                 self.save()
                 return comment
-        raise KeyError(f"Comment {comment_id} not found in project {project_id}")
+        raise CommentNotFound(f"Comment {comment_id} not found in project {project_id}")
 
     # --- Task comments ---
     def list_task_comments(self, project_id: UUID, task_id: UUID) -> list[Comment]:
@@ -1085,6 +1393,7 @@ class LocalRepository:
         _, task = self._get_task_with_index(project, task_id)
         return list(task.comments)
 
+    @_mutation
     def add_task_comment(self, project_id: UUID, task_id: UUID, comment: Comment) -> Comment:
         p_idx, project = self._get_project_with_index(project_id)
         t_idx, task = self._get_task_with_index(project, task_id)
@@ -1094,6 +1403,7 @@ class LocalRepository:
         self.save()
         return comment
 
+    @_mutation
     def delete_task_comment(self, project_id: UUID, task_id: UUID, comment_id: UUID) -> None:
         p_idx, project = self._get_project_with_index(project_id)
         t_idx, task = self._get_task_with_index(project, task_id)
@@ -1104,8 +1414,9 @@ class LocalRepository:
                 self.store.projects[p_idx] = project
                 self.save()
                 return
-        raise KeyError(f"Comment {comment_id} not found in task {task_id}")
+        raise CommentNotFound(f"Comment {comment_id} not found in task {task_id}")
 
+    @_mutation
     def update_task_comment(self, project_id: UUID, task_id: UUID, comment_id: UUID, text: str) -> Comment:
         p_idx, project = self._get_project_with_index(project_id)
         t_idx, task = self._get_task_with_index(project, task_id)
@@ -1117,13 +1428,14 @@ class LocalRepository:
                 self.store.projects[p_idx] = project
                 self.save()
                 return comment
-        raise KeyError(f"Comment {comment_id} not found in task {task_id}")
+        raise CommentNotFound(f"Comment {comment_id} not found in task {task_id}")
 
     # --- History ---
     def list_history(self, project_id: UUID) -> list[HistoryEvent]:
         _, project = self._get_project_with_index(project_id)
         return list(project.history)
 
+    @_mutation
     def add_history_event(self, project_id: UUID, event: HistoryEvent) -> HistoryEvent:
         p_idx, project = self._get_project_with_index(project_id)
         project.history.insert(0, event)
@@ -1131,6 +1443,7 @@ class LocalRepository:
         self.save()
         return event
 
+    @_mutation
     def delete_history_event(self, project_id: UUID, event_id: UUID) -> None:
         p_idx, project = self._get_project_with_index(project_id)
         for e_idx, event in enumerate(project.history):
@@ -1139,7 +1452,7 @@ class LocalRepository:
                 self.store.projects[p_idx] = project
                 self.save()
                 return
-        raise KeyError(f"History event {event_id} not found in project {project_id}")
+        raise HistoryEventNotFound(f"History event {event_id} not found in project {project_id}")
 
     # --- Dashboard aggregations ---
     def _project_matches_filters(
@@ -1148,14 +1461,16 @@ class LocalRepository:
         *,
         include_archived: bool,
         group_id: UUID | None,
-        brand: str | None,
-        statuses: set[ProjectStatus] | None,
+        brand_lc: str | None,
+        statuses: AbstractSet[ProjectStatus] | None,
     ) -> bool:
+        """Проверить проект по фильтрам дашборда; бренд передаётся уже в нижнем регистре."""
+
         if not include_archived and project.status == ProjectStatus.ARCHIVED:
             return False
         if group_id and project.group_id != group_id:
             return False
-        if brand and project.brand.lower() != brand.lower():
+        if brand_lc and project.brand.lower() != brand_lc:
             return False
         if statuses and project.status not in statuses:
             return False
@@ -1197,7 +1512,7 @@ class LocalRepository:
         include_archived: bool = False,
         group_id: UUID | None = None,
         brand: str | None = None,
-        statuses: set[ProjectStatus] | None = None,
+        statuses: AbstractSet[ProjectStatus] | None = None,
         upcoming_limit: int = 10,
         changes_limit: int = 24,
     ) -> DashboardPayload:
@@ -1210,6 +1525,7 @@ class LocalRepository:
                 group.id for group in self.store.product_groups if group.status != GroupStatus.ARCHIVED
             }
 
+        brand_lc = brand.lower() if brand else None
         filtered_projects = [
             project
             for project in self.store.projects
@@ -1217,7 +1533,7 @@ class LocalRepository:
                 project,
                 include_archived=include_archived,
                 group_id=group_id,
-                brand=brand,
+                brand_lc=brand_lc,
                 statuses=statuses,
             )
             and (
@@ -1251,7 +1567,7 @@ class LocalRepository:
                 gtm_distribution.none += 1
                 continue
 
-            stages_sorted = sorted(project.gtm_stages, key=lambda s: s.order)
+            stages_sorted = sorted(project.gtm_stages, key=_BY_ORDER)
             current_index: int | None = None
             if project.current_gtm_stage_id:
                 for idx, stage in enumerate(stages_sorted):
@@ -1327,7 +1643,7 @@ class LocalRepository:
                         )
                     )
 
-        upcoming.sort(key=lambda item: item.days_delta)
+        upcoming.sort(key=attrgetter("days_delta"))
         upcoming = upcoming[:upcoming_limit]
 
         recent_events: list[RecentChange] = []
@@ -1367,7 +1683,7 @@ class LocalRepository:
                 )
 
         if collect_recent:
-            recent_events.sort(key=lambda item: item.occurred_at, reverse=True)
+            recent_events.sort(key=attrgetter("occurred_at"), reverse=True)
             recent_events = recent_events[:changes_limit]
         else:
             recent_events = []
@@ -1404,7 +1720,7 @@ class LocalRepository:
             ),
             brands=[
                 BrandMetric(brand=name, projects=count)
-                for name, count in sorted(brand_metrics.items(), key=lambda item: item[1], reverse=True)
+                for name, count in sorted(brand_metrics.items(), key=itemgetter(1), reverse=True)
             ],
             gtm_distribution=gtm_distribution,
             risk_projects=sorted(
@@ -1491,7 +1807,7 @@ class LocalRepository:
                 )
             )
 
-        backups.sort(key=lambda item: item.created_at, reverse=True)
+        backups.sort(key=attrgetter("created_at"), reverse=True)
         return backups
 
     def create_backup(self, backups_dir: Path) -> BackupInfo:
@@ -1499,13 +1815,14 @@ class LocalRepository:
         timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
         file_name = f"project_tracker_{timestamp}.json"
         destination = backups_dir / file_name
-        _write_json(destination, self.store)
+        _write_json(destination, self._snapshot()[1])
         stat = destination.stat()
         return BackupInfo(
             file_name=file_name,
             created_at=datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
         )
 
+    @_mutation
     def restore_from_backup(self, backups_dir: Path, file_name: str) -> BackupInfo:
         backup_path = backups_dir / file_name
         if not backup_path.exists():
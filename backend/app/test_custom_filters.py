@@ -74,54 +74,51 @@ def make_repo(tmp_path: Path) -> LocalRepository:
 
 
 def test_project_custom_field_filters(tmp_path: Path):
-    repo = make_repo(tmp_path / "store.json")
-
-    # Select filter (color) AND numeric range (size)
-    filters = [
-        CustomFieldFilterRequest(field_id="color", type="select", values=["red"]),
-        CustomFieldFilterRequest(field_id="size", type="number", value_from=12, value_to=20),
-    ]
-    results = repo.list_projects(filters=filters)
-    assert len(results) == 1
-    assert results[0].custom_fields["size"] == 15
-
-    # Boolean filter
-    bool_filter = [CustomFieldFilterRequest(field_id="approved", type="checkbox", bool=True)]
-    approved = repo.list_projects(filters=bool_filter)
-    assert [p.name for p in approved] == ["Project 1"]
+    with make_repo(tmp_path / "store.json") as repo:
+        # Select filter (color) AND numeric range (size)
+        filters = [
+            CustomFieldFilterRequest(field_id="color", type="select", values=["red"]),
+            CustomFieldFilterRequest(field_id="size", type="number", value_from=12, value_to=20),
+        ]
+        results = repo.list_projects(filters=filters)
+        assert len(results) == 1
+        assert results[0].custom_fields["size"] == 15
+
+        # Boolean filter
+        bool_filter = [CustomFieldFilterRequest(field_id="approved", type="checkbox", bool=True)]
+        approved = repo.list_projects(filters=bool_filter)
+        assert [p.name for p in approved] == ["Project 1"]
 
 
 def test_group_custom_field_filters(tmp_path: Path):
-    repo = make_repo(tmp_path / "store.json")
+    with make_repo(tmp_path / "store.json") as repo:
+        filters = [
+            CustomFieldFilterRequest(field_id="color", type="select", values=["red"]),
+            CustomFieldFilterRequest(field_id="volume", type="number", value_from=11, value_to=16),
+        ]
+        results = repo.list_groups(filters=filters)
+        assert len(results) == 1
+        assert results[0].name == "Group C"
 
-    filters = [
-        CustomFieldFilterRequest(field_id="color", type="select", values=["red"]),
-        CustomFieldFilterRequest(field_id="volume", type="number", value_from=11, value_to=16),
-    ]
-    results = repo.list_groups(filters=filters)
-    assert len(results) == 1
-    assert results[0].name == "Group C"
-
-    # Boolean tri-state
-    featured = repo.list_groups(filters=[CustomFieldFilterRequest(field_id="featured", type="checkbox", bool=True)])
-    assert [g.name for g in featured] == ["Group A"]
+        # Boolean tri-state
+        featured = repo.list_groups(filters=[CustomFieldFilterRequest(field_id="featured", type="checkbox", bool=True)])
+        assert [g.name for g in featured] == ["Group A"]
 
 
 def test_filter_metadata_counts_only_reusable(tmp_path: Path):
-    repo = make_repo(tmp_path / "store.json")
-
-    project_meta = repo.list_project_filter_meta()
-    group_meta = repo.list_group_filter_meta()
-
-    project_fields = {m.field_id for m in project_meta}
-    group_fields = {m.field_id for m in group_meta}
-
-    # Fields used in more than one entity are included; one-off fields omitted
-    assert "color" in project_fields
-    assert "size" in project_fields
-    assert "approved" in project_fields
-    assert "note" not in project_fields
-
-    assert "color" in group_fields
-    assert "volume" in group_fields
-    assert "featured" in group_fields
+    with make_repo(tmp_path / "store.json") as repo:
+        project_meta = repo.list_project_filter_meta()
+        group_meta = repo.list_group_filter_meta()
+
+        project_fields = {m.field_id for m in project_meta}
+        group_fields = {m.field_id for m in group_meta}
+
+        # Fields used in more than one entity are included; one-off fields omitted
+        assert "color" in project_fields
+        assert "size" in project_fields
+        assert "approved" in project_fields
+        assert "note" not in project_fields
+
+        assert "color" in group_fields
+        assert "volume" in group_fields
+        assert "featured" in group_fields
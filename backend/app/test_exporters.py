@@ -0,0 +1,162 @@
+from datetime import date
+from io import BytesIO
+from uuid import uuid4
+
+from openpyxl import load_workbook
+
+from app.exporters import (
+    export_all_characteristics,
+    export_characteristics_to_excel,
+    export_gtm_stages_to_excel,
+    export_projects_to_excel,
+    import_characteristics_bulk,
+    import_characteristics_from_excel,
+    import_gtm_stages_from_excel,
+    import_projects_from_excel,
+)
+from app.models import (
+    CharacteristicField,
+    CharacteristicSection,
+    ChecklistItem,
+    Comment,
+    FieldType,
+    GTMStage,
+    PriorityLevel,
+    ProductGroup,
+    Project,
+    ProjectStatus,
+    StageStatus,
+    Subtask,
+    Task,
+    TaskUrgency,
+)
+
+
+def make_project(group: ProductGroup) -> Project:
+    stage_a = GTMStage(
+        title="Разработка",
+        order=0,
+        planned_start=date(2024, 1, 10),
+        status=StageStatus.DONE,
+        risk_flag=True,
+        checklist=[ChecklistItem(title="ТЗ", done=True, order=0), ChecklistItem(title="Макет", order=1)],
+    )
+    stage_b = GTMStage(title="Запуск", order=1, planned_end=date(2024, 6, 1))
+    return Project(
+        id=uuid4(),
+        short_id=7,
+        group_id=group.id,
+        name="Project X",
+        brand="Alpha",
+        market="RU",
+        status=ProjectStatus.LAUNCHED,
+        priority=PriorityLevel.HIGH,
+        planned_launch=date(2024, 6, 1),
+        current_gtm_stage_id=stage_b.id,
+        moq=100,
+        custom_fields={"color": "red"},
+        gtm_stages=[stage_a, stage_b],
+        tasks=[
+            Task(
+                title="Согласовать цену",
+                gtm_stage_id=stage_a.id,
+                important=True,
+                urgency=TaskUrgency.HIGH,
+                subtasks=[Subtask(title="FOB", order=0), Subtask(title="RRP", done=True, order=1)],
+                comments=[Comment(text="Ждём ответ")],
+            )
+        ],
+        characteristics=[
+            CharacteristicSection(
+                title="Габариты",
+                order=0,
+                fields=[
+                    CharacteristicField(label_ru="Вес", label_en="Weight", value_ru=12.5, field_type=FieldType.NUMBER),
+                    CharacteristicField(label_ru="Цвет", label_en="Color", value_ru="белый", order=1),
+                ],
+            )
+        ],
+    )
+
+
+def test_projects_export_roundtrip():
+    group = ProductGroup(name="Холодильники")
+    project = make_project(group)
+    archived = project.model_copy(update={"id": uuid4(), "name": "Old", "status": ProjectStatus.ARCHIVED})
+
+    content = export_projects_to_excel(projects=[project, archived], groups=[group], include_archived=False)
+    parsed, errors = import_projects_from_excel(content, [group], [project])
+
+    assert errors == []
+    assert [p.id for p in parsed] == [project.id]
+    restored = parsed[0]
+    assert restored.status == ProjectStatus.LAUNCHED
+    assert restored.priority == PriorityLevel.HIGH
+    assert restored.planned_launch == date(2024, 6, 1)
+    assert restored.current_gtm_stage_id == project.current_gtm_stage_id
+    assert restored.custom_fields == {"color": "red"}
+
+
+def test_gtm_export_roundtrip():
+    group = ProductGroup(name="Холодильники")
+    project = make_project(group)
+
+    stages, tasks, errors = import_gtm_stages_from_excel(export_gtm_stages_to_excel(project))
+
+    assert errors == []
+    assert [s.title for s in stages] == ["Разработка", "Запуск"]
+    assert stages[0].status == StageStatus.DONE and stages[0].risk_flag
+    assert [(item.title, item.done) for item in stages[0].checklist] == [("ТЗ", True), ("Макет", False)]
+    assert len(tasks) == 1
+    task = tasks[0]
+    assert task.gtm_stage_id == stages[0].id
+    assert task.important and task.urgency == TaskUrgency.HIGH
+    assert [(s.title, s.done) for s in task.subtasks] == [("FOB", False), ("RRP", True)]
+    assert [c.text for c in task.comments] == ["Ждём ответ"]
+
+
+def test_characteristics_export_roundtrip():
+    group = ProductGroup(name="Холодильники")
+    source = make_project(group)
+    target = source.model_copy(update={"characteristics": []})
+
+    sections, errors, report = import_characteristics_from_excel(export_characteristics_to_excel(source), target)
+
+    assert errors == []
+    assert report["sections_created"] == 1 and report["fields_created"] == 2
+    assert [(f.label_ru, f.value_ru) for f in sections[0].fields] == [("Вес", 12.5), ("Цвет", "белый")]
+
+
+def test_characteristics_import_updates_existing_sections_without_mutating_project():
+    group = ProductGroup(name="Холодильники")
+    project = make_project(group)
+    changed = project.model_copy(deep=True)
+    changed.characteristics[0].fields[0].value_ru = 13
+    snapshot = project.model_dump()
+
+    sections, errors, report = import_characteristics_from_excel(export_characteristics_to_excel(changed), project)
+
+    assert errors == []
+    assert report["sections_created"] == 0 and report["fields_updated"] == 2
+    assert sections[0].fields[0].value_ru == 13
+    assert project.model_dump() == snapshot
+
+    _, errors, report = import_characteristics_from_excel(export_gtm_stages_to_excel(project), project)
+    assert errors and report["fields_updated"] == 0
+
+
+def test_all_characteristics_export_roundtrip():
+    group = ProductGroup(name="Холодильники")
+    project = make_project(group).model_copy(update={"name": "Холодильник с очень длинным названием модели"})
+    changed = project.model_copy(deep=True)
+    changed.characteristics[0].fields[1].value_ru = "чёрный"
+
+    content = export_all_characteristics([changed], [group])
+    sheet = load_workbook(BytesIO(content)).worksheets[0]
+    assert [cell.value for cell in sheet[1]][:2] == [f"Проект: {project.name}", "Группа: Холодильники"]
+    assert sheet.cell(row=2, column=1).value == "Секция"
+
+    updates, errors = import_characteristics_bulk(content, [project])
+
+    assert errors == []
+    assert [f.value_ru for f in updates[project.id][0].fields] == [12.5, "чёрный"]
@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.models import Comment, ProductGroup, Project, ProjectStatus
+from app.storage import LocalRepository
+
+
+def test_saves_are_coalesced_and_flushed(tmp_path):
+    path = tmp_path / "store.json"
+    with LocalRepository(path) as repo:
+        with repo.batch():
+            repo.add_group(ProductGroup(name="Холодильники"))
+            repo.add_group(ProductGroup(name="Стиральные машины"))
+        repo.flush()
+        assert repo.version == 2
+    assert not repo._writer.is_alive()
+
+    with LocalRepository(path) as reopened:
+        assert [g.name for g in reopened.list_groups()] == ["Холодильники", "Стиральные машины"]
+    assert not (tmp_path / "store.json.tmp").exists()
+
+
+def test_project_filters_follow_updates(tmp_path):
+    with LocalRepository(tmp_path / "store.json") as repo:
+        group_a = repo.add_group(ProductGroup(name="A"))
+        group_b = repo.add_group(ProductGroup(name="B"))
+        first = repo.add_project(Project(name="P1", group_id=group_a.id, brand="Alpha", market="RU"))
+        repo.add_project(Project(name="P2", group_id=group_b.id, brand="Alpha", market="RU"))
+        third = repo.add_project(Project(name="P3", group_id=group_a.id, brand="Alpha", market="RU"))
+
+        assert [p.name for p in repo.list_projects(group_id=group_a.id)] == ["P1", "P3"]
+
+        repo.update_project_checked(first.id, first.model_copy(update={"status": ProjectStatus.CLOSED}))
+        repo.update_project_checked(third.id, third.model_copy(update={"group_id": group_b.id}))
+
+        statuses = {ProjectStatus.CLOSED, ProjectStatus.IN_PROGRESS}
+        assert [p.name for p in repo.list_projects(statuses=statuses)] == ["P1", "P2", "P3"]
+        assert [p.name for p in repo.list_projects(group_id=group_b.id, statuses={ProjectStatus.CLOSED})] == []
+        assert [p.name for p in repo.list_projects(group_id=group_b.id)] == ["P2", "P3"]
+
+
+def test_lookups_check_index_against_live_lists(tmp_path):
+    with LocalRepository(tmp_path / "store.json") as repo:
+        first = repo.add_group(ProductGroup(name="A"))
+        assert repo.get_group(first.id) is first
+
+        # Список изменён без save(): индекс той же версии не должен скрыть новую группу
+        added = ProductGroup(name="B")
+        repo.store.product_groups.insert(0, added)
+        assert repo.get_group(added.id) is added
+        assert repo.get_group(first.id) is first
+
+
+def test_concurrent_mutations_change_version_tag(tmp_path):
+    with LocalRepository(tmp_path / "store.json") as repo:
+        group = repo.add_group(ProductGroup(name="A"))
+        project = repo.add_project(Project(name="P", group_id=group.id, brand="Alpha", market="RU"))
+        etag = repo.version_tag
+        version = repo.version
+
+        def comment(n: int) -> None:
+            repo.add_project_comment(project.id, Comment(text=f"#{n}"))
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            list(pool.map(comment, range(200)))
+
+        assert repo.version == version + 200
+        assert repo.version_tag != etag
+        assert len(repo.get_project(project.id).comments) == 200
@@ -167,6 +167,12 @@ def run_smoke() -> Path:
         "complete subtask",
     )
 
+    # Повторный GET без изменений отдаёт 304, после изменения — новые данные
+    tasks_url = f"/api/projects/{project_id}/tasks"
+    etag = client.get(tasks_url).headers.get("etag")
+    if not etag or client.get(tasks_url, headers={"If-None-Match": etag}).status_code != 304:
+        raise AssertionError("tasks list: ETag not honoured")
+
     # Комментарии
     comment = _assert_ok(
         client.post(
@@ -184,6 +190,9 @@ def run_smoke() -> Path:
         "update comment",
     )
 
+    if client.get(tasks_url, headers={"If-None-Match": etag}).status_code != 200:
+        raise AssertionError("tasks list: stale ETag accepted after update")
+
     # Бэкап
     _assert_ok(client.post("/api/backups"), "create backup")
     backups = _assert_ok(client.get("/api/backups"), "list backups")